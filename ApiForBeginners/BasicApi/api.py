@@ -1,10 +1,25 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
 from enum import Enum
-from typing import Optional, Union
+from typing import List, Optional, Union
+import operator
 
 app = FastAPI()
 
+# FastAPI's 422 repeats each invalid value as "input"; for a batch that is
+# the whole column (up to a million items), so /calculate/batch only says where
+# and why. Every other route keeps FastAPI's default 422.
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    if getattr(request.scope.get("route"), "path", None) != "/calculate/batch":
+        return await request_validation_exception_handler(request, exc)
+    errors = [{key: value for key, value in error.items() if key != "input"} for error in exc.errors()]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
 # Define supported operations using Enum
 class Operation(str, Enum):
     add = "add"
@@ -42,6 +57,43 @@ async def calculate(data: CalculationRequest):
         "result": result
     }
 
+# Exact (arbitrary precision) implementation of each operation, for /calculate/batch
+OPERATIONS = {
+    Operation.add: operator.add,
+    Operation.subtract: operator.sub,
+    Operation.multiply: operator.mul,
+}
+
+# Largest batch accepted by /calculate/batch
+MAX_BATCH_SIZE = 1_000_000
+
+# Columnar batch: row i is operation[i] applied to number1[i] and number2[i]
+class CalculationBatchRequest(BaseModel):
+    operation: List[Operation] = Field(max_length=MAX_BATCH_SIZE)
+    number1: List[int] = Field(max_length=MAX_BATCH_SIZE)
+    number2: List[int] = Field(max_length=MAX_BATCH_SIZE)
+
+# results[i] belongs to row i of the request
+class CalculationBatchResponse(BaseModel):
+    results: List[int]
+
+# One request for many calculations: the per-call HTTP and validation overhead
+# is what dominates /calculate, not the arithmetic. Python ints never overflow,
+# and since the columns arrive as Python lists, a single zip over them is
+# faster than converting to and from NumPy arrays. A plain def, so a large
+# batch runs in the threadpool instead of blocking the event loop; the
+# response is encoded directly rather than validated again.
+@app.post("/calculate/batch", response_model=CalculationBatchResponse)
+def calculate_batch(data: CalculationBatchRequest):
+    # The columns must line up row for row
+    if not len(data.operation) == len(data.number1) == len(data.number2):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="operation, number1 and number2 must have the same length")
+    results = [OPERATIONS[operation](number1, number2)
+               for operation, number1, number2 in zip(data.operation, data.number1, data.number2)]
+    return Response(content=CalculationBatchResponse.model_construct(results=results).model_dump_json(),
+                    media_type="application/json")
+
 
 ## Using Body
 # from fastapi import FastAPI, Body
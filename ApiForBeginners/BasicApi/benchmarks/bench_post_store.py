@@ -0,0 +1,83 @@
+"""Per-operation cost of PostStore as it grows, next to the list scans it
+replaced in new.py. Run from the repository root:
+
+    python ApiForBeginners/BasicApi/benchmarks/bench_post_store.py
+"""
+import datetime
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path[:0] = [str(Path(__file__).resolve().parent.parent)]
+from post_store import PostStore  # noqa: E402
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+START = datetime.datetime(2025, 1, 1)
+
+
+class Post:
+    __slots__ = ("id", "published_date")
+
+    def __init__(self, id, published_date):
+        self.id = id
+        self.published_date = published_date
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def bench(size):
+    posts = [Post(i, START + datetime.timedelta(minutes=i)) for i in range(size)]
+    store = PostStore(posts)
+    as_list = list(posts)
+    rng = random.Random(size)
+    next_id = iter(range(size, 10 * size))
+
+    def get():
+        store.get(rng.randrange(size))
+
+    def redate():
+        store.update(rng.randrange(size), published_date=START + datetime.timedelta(minutes=rng.randrange(size)))
+
+    def delete_and_add():
+        post_id = rng.randrange(size)
+        post = store.get(post_id)
+        if post is not None and store.delete(post_id):
+            store.add(Post(next(next_id), post.published_date))
+
+    def latest():
+        store.latest()
+
+    def between():
+        start = START + datetime.timedelta(minutes=rng.randrange(size))
+        store.between(start, start + datetime.timedelta(minutes=10))
+
+    # What new.py did before: a generator scan per lookup, max() for latest
+    def list_get():
+        post_id = rng.randrange(size)
+        next(p for p in as_list if p.id == post_id)
+
+    def list_latest():
+        max(as_list, key=lambda p: p.published_date)
+
+    row = {name: per_call_us(fn, 2000) for name, fn in
+           [("get", get), ("redate", redate), ("delete+add", delete_and_add),
+            ("latest", latest), ("between", between)]}
+    scans = 2000 if size <= 10_000 else 20
+    row["list get"] = per_call_us(list_get, scans)
+    row["list latest"] = per_call_us(list_latest, scans)
+    return row
+
+
+def main():
+    rows = {size: bench(size) for size in SIZES}
+    names = list(rows[SIZES[0]])
+    print(f"{'us/op':>12}" + "".join(f"{size:>12,}" for size in SIZES))
+    for name in names:
+        print(f"{name:>12}" + "".join(f"{rows[size][name]:>12.2f}" for size in SIZES))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,10 @@
 import os
-import yaml
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from shared.settings import get_settings
 
-# Load configuration from YAML file
-with open(r"C:\Users\user\Desktop\ApiDevelopment\ApiTutorial\ApiForBeginners\ORM\config.yaml", "r") as file:
-    config = yaml.safe_load(file)
-
-db_config = config["database"]
+# config.yaml from $API_CONFIG, or ApiForBeginners/ORM/config.yaml
+db_config = get_settings()["database"]
 
 # Connecting to PostgreSQL using psycopg2
 try:
@@ -1,10 +1,14 @@
 from fastapi import FastAPI
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
+from typing_extensions import TypedDict
 import datetime
 from typing import List, Optional, Union
 from fastapi import HTTPException, status, Response
+from post_store import PostStore
+from shared.metrics import install_metrics
 
 app = FastAPI()
+install_metrics(app)
 ## Basic CRUD Operations
 
 class Post(BaseModel):
@@ -22,8 +26,23 @@ class PostUpdate(BaseModel):
     content: Optional[str] = None
     rating: Optional[float] = None
 
-# Pre-filled in-memory storage for posts
-posts_db: List[Post] = []
+# List responses are encoded straight from the stored Post models in one
+# dump_json call, instead of model_dump() per post followed by FastAPI
+# encoding the resulting dicts again
+class PostList(TypedDict):
+    message: str
+    posts: List[Post]
+
+post_list_adapter = TypeAdapter(PostList)
+
+class PostListResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return post_list_adapter.dump_json(content)
+
+# Pre-filled in-memory storage for posts, indexed by id and published_date
+posts_db = PostStore()
 
 # Add initial sample posts
 posts_db.extend([
@@ -66,25 +85,27 @@ async def create_posts(new_posts: List[Post]):
 # GET request - Retrieve all posts
 @app.get("/getposts")
 async def get_posts():
-    return {
-        "message": "success",
-        "posts": [post.model_dump() for post in posts_db]
-    }
+    return PostListResponse({"message": "success", "posts": list(posts_db)})
+
+# GET request - Posts published in a date range (inclusive), oldest first
+@app.get("/posts_by_date")
+async def get_posts_by_date(start: datetime.datetime, end: datetime.datetime):
+    return PostListResponse({"message": "success", "posts": posts_db.between(start, end)})
 
 
 @app.get("/posts/{id}")
 async def get_post(id):
-    for post in posts_db:
-        if post.id == int(id):
-            return {
-                "message": "success",
-                "post": post.model_dump()}
+    post = posts_db.get(int(id))
+    if post:
+        return {
+            "message": "success",
+            "post": post.model_dump()}
             
 
 @app.get("/post/{id}")
 # Response: Setting The status code yourself
 async def get_post(id: int, response : Response):
-    post = next((post for post in posts_db if post.id ==id ), None)
+    post = posts_db.get(id)
     
     if post:
         return {
@@ -108,7 +129,7 @@ async def get_post(id: int, response : Response):
          
 @app.get("/post_/{id}", response_model=Post)
 async def get_post(id: int, response: Response):
-    post = next((post for post in posts_db if post.id == id), None)
+    post = posts_db.get(id)
     
     if post:
         return post  # FastAPI auto-converts Pydantic model to JSON
@@ -119,7 +140,7 @@ async def get_post(id: int, response: Response):
 
 @app.get("/posts_/{id}", response_model = Union[Post, dict])  # Allow dict for error response
 async def get_post(id: int, response: Response):
-    post = next((post for post in posts_db if post.id == id), None)
+    post = posts_db.get(id)
 
     if post:
         return post  # ✅ FastAPI converts it to JSON
@@ -130,7 +151,7 @@ async def get_post(id: int, response: Response):
 ## Using HTTP Exceptions instead 
 @app.get("/posts__/{id}", response_model = Union[Post, dict])  # Allow dict for error response
 async def get_post(id: int):
-    post = next((post for post in posts_db if post.id == id), None)
+    post = posts_db.get(id)
 
     if post:
         return post  # ✅ FastAPI converts it to JSON
@@ -143,7 +164,7 @@ async def latest():
     if not posts_db:  # Check if posts_db is empty
         return {"message": "No posts available"}
 
-    latest_post = max(posts_db, key=lambda post: post.published_date, default=None)
+    latest_post = posts_db.latest()
 
     if latest_post is None:
         return {"message": "No posts found"}
@@ -157,20 +178,18 @@ async def latest():
 # Update
 @app.put("/post/{id}")
 async def update_post(id: int, updated_post: Post):
-    for i, post in enumerate(posts_db):
-        if post.id == id:
-            posts_db[i] = updated_post
-            return {"message": "success", "post": updated_post.model_dump()}
+    if posts_db.replace(id, updated_post):
+        return {"message": "success", "post": updated_post.model_dump()}
     
     return {"message": "Post not found"}
 
 @app.put("/post/{id}")
 async def update_post(id: int, updated_post: Post):
-    post = next((p for p in posts_db if p.id == id), None)
+    post = posts_db.get(id)
 
     if post:
-        posts_db.remove(post)  # Remove the old post
-        posts_db.append(updated_post)  # Add the updated post
+        posts_db.delete(id)  # Remove the old post
+        posts_db.add(updated_post)  # Add the updated post
         return {"message": "success", "post": updated_post.model_dump()}
     
     return {"message": "Post not found"}
@@ -178,15 +197,14 @@ async def update_post(id: int, updated_post: Post):
 
 @app.put("/post/{id}")
 async def update_post(id: int, updated_post: Post):
-    post = next((p for p in posts_db if p.id == id), None)
+    post = posts_db.update(id,
+                           author=updated_post.author,
+                           title=updated_post.title,
+                           content=updated_post.content,
+                           published_date=updated_post.published_date,
+                           rating=updated_post.rating)
 
     if post:
-        post.author = updated_post.author
-        post.title = updated_post.title
-        post.content = updated_post.content
-        post.published_date = updated_post.published_date
-        post.rating = updated_post.rating
-        
         return {"message": "success", "post": post.model_dump()}
     
     return {"message": "Post not found"}
@@ -195,10 +213,8 @@ async def update_post(id: int, updated_post: Post):
 # Delete
 @app.delete("/delete_post/{id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post(id: int):
-    for i, post in enumerate(posts_db):
-        if post.id == id:
-            del posts_db[i]
-            return {"message": "successful, post was deleted"}
+    if posts_db.delete(id):
+        return {"message": "successful, post was deleted"}
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                         detail=f"Post with id {id} was not found"
     )    
@@ -206,28 +222,27 @@ async def delete_post(id: int):
     
 @app.patch("/post/{id}")
 async def update_post(id: int, updated_data: PostUpdate):
-    for post in posts_db:
-        if post.id == id:
-            # Update only provided fields
-            updated_fields = updated_data.model_dump(exclude_unset=True)
-            for key, value in updated_fields.items():
-                setattr(post, key, value)
-            return {"message": "success", "post": post.model_dump()}
+    # Update only provided fields
+    updated_fields = updated_data.model_dump(exclude_unset=True)
+    post = posts_db.update(id, **updated_fields)
+    if post:
+        return {"message": "success", "post": post.model_dump()}
 
     raise HTTPException(status_code=404, detail=f"Post with id {id} not found")
 
 @app.patch("/post_/{id}")
 async def update_post(id: int, updated_data: PostUpdate):
-    for index, post in enumerate(posts_db):
-        if post.id == id:
-            updated_fields = updated_data.model_dump(exclude_unset=True)
+    post = posts_db.get(id)
+    if post:
+        updated_fields = updated_data.model_dump(exclude_unset=True)
 
-            # Convert Pydantic model to dictionary, update fields
-            updated_post_data = post.model_dump()  # Convert to dict
-            updated_post_data.update(updated_fields)  # Apply updates
+        # Convert Pydantic model to dictionary, update fields
+        updated_post_data = post.model_dump()  # Convert to dict
+        updated_post_data.update(updated_fields)  # Apply updates
 
-            # Replace the existing post with an updated instance
-            posts_db[index] = Post(**updated_post_data)  # Recreate the object
-            return {"message": "success", "post": posts_db[index].model_dump()}
+        # Replace the existing post with an updated instance
+        new_post = Post(**updated_post_data)  # Recreate the object
+        posts_db.replace(id, new_post)
+        return {"message": "success", "post": new_post.model_dump()}
 
     raise HTTPException(status_code=404, detail=f"Post with id {id} not found")
\ No newline at end of file
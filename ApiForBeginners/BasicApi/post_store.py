@@ -0,0 +1,137 @@
+import bisect
+import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class SortedKeys:
+    """A sorted list kept as consecutive chunks of at most 2 * `chunk_size`
+    keys, so an insert or removal shifts one chunk rather than every key
+    after it. `_maxes` holds each chunk's last key, to bisect to the chunk."""
+
+    def __init__(self, chunk_size: int = 512):
+        self.chunk_size = chunk_size
+        self._chunks: List[list] = []
+        self._maxes: list = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key):
+        self._len += 1
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            return
+        i = min(bisect.bisect_left(self._maxes, key), len(self._chunks) - 1)
+        chunk = self._chunks[i]
+        bisect.insort(chunk, key)
+        self._maxes[i] = chunk[-1]
+        if len(chunk) > 2 * self.chunk_size:
+            self._chunks[i:i + 1] = [chunk[:self.chunk_size], chunk[self.chunk_size:]]
+            self._maxes[i:i + 1] = [chunk[self.chunk_size - 1], chunk[-1]]
+
+    def remove(self, key):
+        i = bisect.bisect_left(self._maxes, key)
+        chunk = self._chunks[i]
+        del chunk[bisect.bisect_left(chunk, key)]
+        self._len -= 1
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i], self._maxes[i]
+
+    def last(self):
+        return self._maxes[-1] if self._maxes else None
+
+    def irange(self, lo, hi) -> Iterator:
+        """Keys with lo <= key <= hi, in order."""
+        i = bisect.bisect_left(self._maxes, lo)
+        if i == len(self._chunks):
+            return
+        j = bisect.bisect_left(self._chunks[i], lo)
+        for chunk in self._chunks[i:]:
+            for key in chunk[j:]:
+                if key > hi:
+                    return
+                yield key
+            j = 0
+
+
+class PostStore:
+    """In-memory posts indexed by id and by published_date.
+
+    `_by_id` maps id -> post for O(1) lookups, updates and deletes. `_by_date`
+    holds a sorted (published_date, id) key per post for "latest" and
+    date-range queries; adding, deleting or re-dating a post moves one key,
+    in O(log n) plus a shift within one chunk of SortedKeys.
+
+    Posts must not be mutated directly: go through `update` so the date index
+    stays in step with the stored objects.
+    """
+
+    def __init__(self, posts=(), chunk_size: int = 512):
+        self._by_id: Dict[int, object] = {}
+        self._by_date = SortedKeys(chunk_size)
+        self.extend(posts)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._by_id.values())
+
+    def __contains__(self, post_id: int) -> bool:
+        return post_id in self._by_id
+
+    def add(self, post):
+        # Adding an existing id replaces it, like a dict assignment
+        old = self._by_id.get(post.id)
+        self._by_id[post.id] = post
+        if old is None:
+            self._by_date.add((post.published_date, post.id))
+        elif old.published_date != post.published_date:
+            self._by_date.remove((old.published_date, old.id))
+            self._by_date.add((post.published_date, post.id))
+
+    def extend(self, posts):
+        for post in posts:
+            self.add(post)
+
+    def get(self, post_id: int):
+        return self._by_id.get(post_id)
+
+    def replace(self, post_id: int, post) -> bool:
+        if post_id not in self._by_id:
+            return False
+        self.delete(post_id)
+        self.add(post)
+        return True
+
+    def update(self, post_id: int, **fields):
+        post = self._by_id.get(post_id)
+        if post is None:
+            return None
+        old_key = (post.published_date, post.id)
+        for key, value in fields.items():
+            setattr(post, key, value)
+        if post.published_date != old_key[0]:
+            self._by_date.remove(old_key)
+            self._by_date.add((post.published_date, post.id))
+        return post
+
+    def delete(self, post_id: int) -> bool:
+        post = self._by_id.pop(post_id, None)
+        if post is None:
+            return False
+        self._by_date.remove((post.published_date, post.id))
+        return True
+
+    def latest(self) -> Optional[object]:
+        key = self._by_date.last()
+        return None if key is None else self._by_id[key[1]]
+
+    def between(self, start: datetime.datetime, end: datetime.datetime) -> List:
+        """Posts with start <= published_date <= end, oldest first."""
+        keys = self._by_date.irange((start, float("-inf")), (end, float("inf")))
+        return [self._by_id[post_id] for _, post_id in keys]
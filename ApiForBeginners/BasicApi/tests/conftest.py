@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The apps import their modules flat (from post_store import PostStore) and
+# shared helpers from the repository root
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(APP_DIR), str(APP_DIR.parent.parent)]
@@ -0,0 +1,29 @@
+from fastapi.testclient import TestClient
+from api import app
+
+client = TestClient(app)
+
+
+def test_calculate_422_keeps_the_input():
+    response = client.post("/calculate", json={"operation": "divide", "number1": 1, "number2": "x"})
+    assert response.status_code == 422
+    errors = response.json()["detail"]
+    assert {error["input"] for error in errors} == {"divide", "x"}
+
+
+def test_batch_422_leaves_the_input_out():
+    numbers = list(range(1000)) + ["x"]
+    response = client.post("/calculate/batch", json={"operation": ["add"] * 1001,
+                                                     "number1": numbers, "number2": numbers})
+    assert response.status_code == 422
+    errors = response.json()["detail"]
+    assert [error["loc"] for error in errors] == [["body", "number1", 1000], ["body", "number2", 1000]]
+    assert all("input" not in error for error in errors)
+
+
+def test_batch():
+    response = client.post("/calculate/batch", json={"operation": ["add", "subtract", "multiply"],
+                                                     "number1": [2, 2, 2 ** 70], "number2": [3, 3, 2]})
+    assert response.json() == {"results": [5, -1, 2 ** 71]}
+    response = client.post("/calculate/batch", json={"operation": ["add"], "number1": [1, 2], "number2": [3]})
+    assert response.status_code == 400
@@ -0,0 +1,78 @@
+import datetime
+from dataclasses import dataclass
+from post_store import PostStore
+
+
+@dataclass
+class Post:
+    id: int
+    published_date: datetime.datetime
+    title: str = ""
+
+
+def day(n):
+    return datetime.datetime(2025, 1, 1) + datetime.timedelta(days=n)
+
+
+def ids(posts):
+    return [post.id for post in posts]
+
+
+def test_latest_and_between():
+    # Out of date order, with two posts on the same day
+    store = PostStore([Post(1, day(3)), Post(2, day(1)), Post(3, day(5)), Post(4, day(3))])
+    assert store.latest().id == 3
+    assert ids(store.between(day(1), day(3))) == [2, 1, 4]
+    assert ids(store.between(day(4), day(9))) == [3]
+    assert store.between(day(6), day(9)) == []
+    assert PostStore().latest() is None
+
+
+def test_delete():
+    store = PostStore([Post(i, day(i)) for i in range(1, 6)])
+    assert store.delete(5) and not store.delete(5)
+    assert 5 not in store and len(store) == 4
+    assert store.latest().id == 4
+    assert ids(store.between(day(0), day(9))) == [1, 2, 3, 4]
+    # A deleted id can come back, on its old date or a new one
+    store.add(Post(5, day(5)))
+    assert store.latest().id == 5
+    store.delete(5)
+    store.add(Post(5, day(0)))
+    assert ids(store.between(day(0), day(9))) == [5, 1, 2, 3, 4]
+    assert store.latest().id == 4
+
+
+def test_redating():
+    store = PostStore([Post(i, day(i)) for i in range(1, 4)])
+    store.update(1, published_date=day(9))
+    assert store.latest().id == 1
+    assert ids(store.between(day(0), day(9))) == [2, 3, 1]
+    store.replace(1, Post(1, day(0), title="replaced"))
+    assert store.get(1).title == "replaced"
+    assert ids(store.between(day(0), day(9))) == [1, 2, 3]
+    assert not store.replace(7, Post(7, day(0)))
+    # Back to a date it had before: the old key is reused, not duplicated
+    store.update(1, published_date=day(9))
+    store.update(1, published_date=day(0))
+    assert ids(store.between(day(0), day(9))) == [1, 2, 3]
+
+
+def test_index_stays_sorted_across_chunk_splits_and_removals():
+    # Tiny chunks, so adds split them and deletes empty them
+    store = PostStore([Post(i, day(i)) for i in range(20)], chunk_size=2)
+    for i in range(0, 20, 2):
+        store.delete(i)
+    for round in range(1, 4):
+        for i in range(1, 20, 2):
+            store.update(i, published_date=day(100 * round - i))
+    assert len(store._by_date) == len(store) == 10
+    assert all(len(chunk) <= 4 for chunk in store._by_date._chunks)
+    assert ids(store.between(day(0), day(1000))) == list(range(19, 0, -2))
+    assert store.latest().id == 1
+    store.delete(1)
+    assert store.latest().id == 3
+    assert ids(store.between(day(285), day(297))) == [15, 13, 11, 9, 7, 5, 3]
+    for i in range(3, 20, 2):
+        store.delete(i)
+    assert store.latest() is None and store.between(day(0), day(1000)) == []
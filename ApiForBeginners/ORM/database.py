@@ -1,18 +1,19 @@
-import yaml
-from sqlalchemy import create_engine
+from shared.engine import create_engine_from_config, database_url
+from shared.settings import get_settings
+from shared.replicas import create_replica_set, track_writes, pinned_to_primary
+from fastapi import Request
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# Load configuration from YAML file
-with open("config.yaml", "r") as file:
-    config = yaml.safe_load(file)
+# Load configuration from config.yaml ($API_CONFIG, or the one in this folder)
+config = get_settings()
 
 # Extract database credentials
 db_config = config["database"]
-DATABASE_URL = f"postgresql://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['name']}"
+DATABASE_URL = database_url(db_config)
 
-# Create database engine
-engine = create_engine(DATABASE_URL)
+# Create database engine (pool settings and timeouts come from config.yaml)
+engine = create_engine_from_config(db_config)
 
 # Define Base ORM model
 Base = declarative_base()
@@ -20,9 +21,23 @@ Base = declarative_base()
 # Create the session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read replicas from database.replicas (none unless configured). An app using
+# get_read_db should call shared.replicas.install_read_your_writes(app, db_config)
+# so clients that just wrote keep reading from the primary.
+replicas = create_replica_set(db_config, engine)
+track_writes(engine)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+# For read-only routes: a session on a replica, or on the primary for recent writers
+def get_read_db(request: Request):
+    db = SessionLocal(bind=replicas.read_engine(pinned_to_primary(request)))
+    try:
+        yield db
+    finally:
+        db.close()
@@ -11,7 +11,7 @@ class User(Base):
     email = Column(String, unique=True, index=True) # User's unique email address
     password_hash = Column(String) # Hashed version of the user's password
     role_id = Column(Integer, ForeignKey('roles.id')) # Foreign key to the 'roles' table, referencing the role ID
-    role = relationship('Role', back_populates='users') # Relationship with the 'roles' table, allowing one-to-many relationship between 'users' and 'roles'
+    role = relationship('Role', back_populates='users', lazy='joined') # Relationship with the 'roles' table, allowing one-to-many relationship between 'users' and 'roles'
     """cascade="all, delete-orphan": This defines how changes 
     to the User affect related Address records. Specifically, 
     when a User is deleted, all their associated Address records 
@@ -31,6 +31,9 @@ class Role(Base):
    ## ForeignKey('roles.id') establishes a foreign key link between User.role_id and Role.id.
    ## relationship('Role', back_populates='users') establishes the ORM relationship.
    ## back_populates='role' ensures bidirectional access between User and Role
+   ## lazy='joined' loads the role in the same query as the user (a LEFT OUTER JOIN),
+   ## so reading user.role.name over a list of users doesn't issue one query per user.
+   ## For Role.users use query(Role).options(selectinload(Role.users)) when listing roles.
    
    
 ## SQLAlchemy 2.0
@@ -62,7 +65,7 @@ class User(Base):
     role_id: Mapped[int] = mapped_column(Integer, ForeignKey('roles.id'))  # Foreign key to the 'roles' table, referencing the role ID
 
     # Relationship to the Role model with mapping type hint
-    role: Mapped["Role"] = relationship('Role', back_populates='users')
+    role: Mapped["Role"] = relationship('Role', back_populates='users', lazy='joined')
 
     def __repr__(self) -> str:
         return f"User(id={self.id!r}, name={self.name!r}, username={self.username!r}, email={self.email!r})"
@@ -1,76 +1,210 @@
-from fastapi import FastAPI, HTTPException, status, Response, Depends, Query
+from fastapi import FastAPI, APIRouter, HTTPException, status, Response, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from models import *
 from schema import *
-from database import get_session
+from database import get_session, get_read_session, SessionLocal
+from shared.engine import create_engine_from_config, pool_metrics
+from shared.metrics import install_metrics, instrument_engine
+from shared.profiling import install_profiling, attach_profiler
+from shared.settings import get_settings
+from shared.replicas import create_replica_set, track_writes, install_read_your_writes
 from sqlmodel import Session
-from typing import Annotated
+from typing import Annotated, Optional, Literal
 from sqlmodel import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, load_only
+from pydantic import TypeAdapter
+from shared.fields import parse_fields, sparse_model
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from hashing import PasswordHasher
 
-from passlib.context import CryptContext
+# bcrypt runs in worker processes; see hashing.py. Login should use
+# password_hasher.verify() so it shares the same bounded pool. Its cost and
+# pool size are set from config.yaml in create_app().
+password_hasher = PasswordHasher()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-app = FastAPI()
+router = APIRouter()
 SessionDep = Annotated[Session, Depends(get_session)]
 # Here, it tells FastAPI that a Session object should be provided by calling get_session whenever SessionDep is used.
+ReadSessionDep = Annotated[Session, Depends(get_read_session)]
+# Same for GET routes, which may be served by a read replica
 
-@app.post("/create_user", response_model=UserResponse, 
-          status_code=status.HTTP_201_CREATED)
+@router.post("/create_user", response_model=UserResponse, 
+             status_code=status.HTTP_201_CREATED)
 async def create_user(user: UserCreate, db: SessionDep) -> UserResponse:
-    # Check for existing user
-    statement = select(User).where(User.username == user.username)
-    user_in_db = db.exec(statement).first()
-    if user_in_db:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="User already exists"
-        )
-
     # Create user with hashed password
     new_user = User(
         name=user.name,
         username=user.username,
         email=user.email,
-        password_hash=hash_password(user.password),
+        password_hash=await password_hasher.hash(user.password),
         role_id=user.role_id
     )
+    # The commit and refresh are blocking round trips; run them in the
+    # threadpool, not on the event loop the hashing just kept free
+    return await run_in_threadpool(insert_user, db, new_user)
+
+def insert_user(db: Session, new_user: User) -> User:
     db.add(new_user)
-    db.commit()
+    # The unique index on username rejects existing users, and the foreign key
+    # unknown roles, in the same round trip
+    try:
+        db.commit()
+    except IntegrityError as error:
+        db.rollback()
+        violation = integrity_violation(error)
+        if violation == "unique" and "username" in str(error.orig):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, 
+                detail="User already exists"
+            )
+        if violation == "unique":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="User conflicts with an existing user"
+            )
+        if violation == "foreign_key":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Role {new_user.role_id} does not exist"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User violates a database constraint"
+        )
     db.refresh(new_user)
     return new_user
 
-@app.post("/create_role", response_model=RoleResponse, 
-          status_code=status.HTTP_201_CREATED)
-async def create_role(role: RoleCreate, db: SessionDep) -> RoleResponse:
-    # check for existing role
-    statement = select(Role).where(Role.name == role.name)
-    role_in_db = db.exec(statement).first()
-    if role_in_db:
+# Which kind of constraint an IntegrityError broke: "unique", "foreign_key" or
+# None. Postgres reports the SQLSTATE and names the constraint in the message
+# (ix_user_username, user_role_id_fkey); SQLite only has the message.
+def integrity_violation(error: IntegrityError) -> Optional[str]:
+    code = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    message = str(error.orig)
+    if code == "23505" or message.startswith("UNIQUE constraint failed"):
+        return "unique"
+    if code == "23503" or message.startswith("FOREIGN KEY constraint failed"):
+        return "foreign_key"
+    return None
+
+@router.post("/create_role", response_model=RoleResponse, 
+             status_code=status.HTTP_201_CREATED)
+def create_role(role: RoleCreate, db: SessionDep) -> RoleResponse:
+    new_role = Role(**role.model_dump())
+    db.add(new_role)
+    # The unique index on name rejects existing roles
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Role already exists"
         )
-    else:
-        new_role = Role(**role.model_dump())
-        db.add(new_role)
-        db.commit()
-        db.refresh(new_role)
-        return new_role
+    db.refresh(new_role)
+    return new_role
 
-@app.get("/users", response_model=List[UserResponse])
-async def get_users(db: SessionDep, limit: Annotated[int, Query(le=100)] = 5) -> List[UserResponse]:
-    users = db.exec(select(User).order_by(User.id).limit(limit)).all()
+# The related rows are loaded with selectinload: one extra query for the whole
+# page rather than one per row. Without the flag the plain response model is
+# returned, so the relationship is never touched (and never lazy-loaded);
+# response_model_exclude_unset then leaves the embedded key out entirely.
+#
+# ?fields=id,username loads only those columns (load_only) and returns only
+# those keys, through a response model derived from UserWithRole.
+@router.get("/users", response_model=List[UserWithRole], response_model_exclude_unset=True)
+async def get_users(db: ReadSessionDep, limit: Annotated[int, Query(le=100)] = 5,
+                    include_role: bool = False, fields: Optional[str] = None) -> List[UserWithRole]:
+    names = parse_fields(fields, UserResponse.model_fields)
+    statement = select(User).order_by(User.id).limit(limit)
+    if include_role:
+        statement = statement.options(selectinload(User.role))
+    if names is not None:
+        # role_id is needed to attach the role without a lazy load per user
+        columns = [getattr(User, name) for name in names] + ([User.role_id] if include_role else [])
+        statement = statement.options(load_only(*columns))
+    users = db.exec(statement).all()
     if users is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No users found")
-    return users
+    if names is not None:
+        return sparse_users_response(users, names, include_role)
+    if include_role:
+        return [UserWithRole.model_validate(user) for user in users]
+    return [UserResponse.model_validate(user) for user in users]
+
+@lru_cache(maxsize=256)
+def _sparse_users_adapter(names) -> TypeAdapter:
+    return TypeAdapter(List[sparse_model(UserWithRole, names)])
 
-@app.get("/roles", response_model=List[RoleResponse])
-async def get_roles(db: SessionDep) -> List[RoleResponse]:
-    role = db.exec(select(Role).order_by(Role.id)).all()
+def sparse_users_response(users, names, include_role: bool) -> Response:
+    keys = names + ("role",) if include_role else names
+    rows = [{name: getattr(user, name) for name in names} for user in users]
+    if include_role:
+        for row, user in zip(rows, users):
+            row["role"] = RoleResponse.model_validate(user.role) if user.role else None
+    return Response(content=_sparse_users_adapter(keys).dump_json(rows), media_type="application/json")
+
+@router.get("/roles", response_model=List[RoleWithUsers], response_model_exclude_unset=True)
+async def get_roles(db: ReadSessionDep, include: Optional[Literal["users"]] = None) -> List[RoleWithUsers]:
+    statement = select(Role).order_by(Role.id)
+    if include == "users":
+        statement = statement.options(selectinload(Role.users))
+    role = db.exec(statement).all()
     if role is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No roles found")
-    return role
\ No newline at end of file
+    if include == "users":
+        return [RoleWithUsers.model_validate(r) for r in role]
+    return [RoleResponse.model_validate(r) for r in role]
+
+# Connection pool occupancy and checkout wait times (see shared/engine.py)
+@router.get("/db/pool")
+async def db_pool_stats(request: Request):
+    stats = pool_metrics(request.app.state.engine)
+    if request.app.state.replicas.replicas:
+        stats["replicas"] = request.app.state.replicas.status()
+    return stats
+
+
+# Reads config.yaml (unless settings are passed in) when the app is created;
+# the engine and the hashing processes are started with the app, and tables
+# come from create_table.py.
+#   uvicorn app:create_app --factory
+def create_app(settings: Optional[dict] = None) -> FastAPI:
+    settings = get_settings() if settings is None else settings
+    password_hasher.configure(settings.get("security", {}))
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        engine = create_engine_from_config(settings["database"])
+        instrument_engine(engine)
+        attach_profiler(engine)
+        SessionLocal.configure(bind=engine)
+        app.state.engine = engine
+        app.state.replicas = create_replica_set(settings["database"], engine)
+        for replica in app.state.replicas.replicas:
+            instrument_engine(replica)
+            attach_profiler(replica)
+        track_writes(engine)
+        password_hasher.start()
+        try:
+            yield
+        finally:
+            password_hasher.shutdown()
+            app.state.replicas.dispose()
+            engine.dispose()
+
+    app = FastAPI(lifespan=lifespan)
+    install_metrics(app)
+    install_read_your_writes(app, settings["database"])
+    install_profiling(app, settings.get("profiling", {}))
+    app.include_router(router)
+    return app
+
+
+# `uvicorn app:app` keeps working: the app is built on first access
+def __getattr__(name):
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
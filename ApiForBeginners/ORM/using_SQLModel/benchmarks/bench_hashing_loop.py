@@ -0,0 +1,60 @@
+"""Event-loop latency while signups hash passwords: bcrypt called on the loop
+(as create_user did before hashing.py) versus PasswordHasher's process pool.
+A ticker task sleeps 1 ms at a time and records how late each wake-up is,
+which is what every other request on the worker would see. Run from the
+repository root:
+
+    python ApiForBeginners/ORM/using_SQLModel/benchmarks/bench_hashing_loop.py [signups] [rounds]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path[:0] = [str(Path(__file__).resolve().parent.parent)]
+from hashing import PasswordHasher, hash_password  # noqa: E402
+
+
+async def measure(signup, count):
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await asyncio.gather(*(signup(f"password {i}") for i in range(count)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await tick
+    lags.sort()
+    return {"signups/s": count / elapsed, "lag p50 ms": statistics.median(lags) * 1000,
+            "lag p99 ms": lags[int(len(lags) * 0.99)] * 1000, "lag max ms": lags[-1] * 1000}
+
+
+async def main(count, rounds):
+    async def on_the_loop(password):
+        hash_password(password, rounds)
+
+    hasher = PasswordHasher(rounds=rounds)
+    hasher.start()
+    try:
+        await hasher.hash("warm up the workers")
+        results = {"on the loop": await measure(on_the_loop, count),
+                   "process pool": await measure(hasher.hash, count)}
+    finally:
+        hasher.shutdown()
+    print(f"{count} signups, bcrypt rounds={rounds}")
+    for name, row in results.items():
+        print(f"{name:>14}: " + ", ".join(f"{key} {value:.1f}" for key, value in row.items()))
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(main(*(args + [32, 12][len(args):])))
@@ -1,10 +1,16 @@
-from database import engine
 from sqlmodel import SQLModel
 from models import User, Role
+from shared.engine import create_engine_from_config
+from shared.settings import get_settings
 
 
+# Run once per database before starting app.py; the app itself never creates tables
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    engine = create_engine_from_config(get_settings()["database"])
+    try:
+        SQLModel.metadata.create_all(engine)
+    finally:
+        engine.dispose()
 
 if __name__ == "__main__":
     create_db_and_tables()
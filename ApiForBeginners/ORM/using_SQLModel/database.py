@@ -1,18 +1,21 @@
-from sqlmodel import create_engine
 from contextlib import contextmanager
+from sqlalchemy.orm import sessionmaker
 from sqlmodel import Session
-import yaml
+from fastapi import Request
+from shared.replicas import pinned_to_primary
 
-with open(r"C:\Users\user\Desktop\ApiDevelopment\ApiTutorial\ApiForBeginners\ORM\config.yaml", "r") as file:
-    config = yaml.safe_load(file)
-
-db_config = config["database"]
-DATABASE_URL = f"postgresql://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['name']}"
-
-engine = create_engine(DATABASE_URL)
+# Bound in the app's lifespan, once the engine has been created from
+# config.yaml (see app.create_app): SessionLocal.configure(bind=engine)
+SessionLocal = sessionmaker(class_=Session)
 
 def get_session():
-    with Session(engine) as session:
+    with SessionLocal() as session:
+        yield session
+
+# For GET routes: a replica session (app.state.replicas, see shared/replicas.py),
+# or the primary for clients that wrote within the last few seconds
+def get_read_session(request: Request):
+    with SessionLocal(bind=request.app.state.replicas.read_engine(pinned_to_primary(request))) as session:
         yield session
         
 
@@ -0,0 +1,72 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import bcrypt
+from fastapi import HTTPException, status
+
+# This module is imported by the worker processes, so keep it free of app and
+# database side effects.
+
+# bcrypt only reads the first 72 bytes of a password. passlib (used before)
+# cut longer ones silently; bcrypt 5 raises instead, so cut them here to keep
+# verifying the hashes passlib made. Both write the same $2b$ format.
+def _secret(password: str) -> bytes:
+    return password.encode()[:72]
+
+def hash_password(password: str, rounds: int = 12) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds)).decode()
+
+def verify_password(password: str, password_hash: str) -> bool:
+    # The cost is read from the hash itself
+    return bcrypt.checkpw(_secret(password), password_hash.encode())
+
+
+class PasswordHasher:
+    """Runs bcrypt in a process pool so hashing never blocks the event loop.
+
+    At most `max_pending` hashes may be queued or running; callers beyond that
+    get a 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: Optional[int] = None, max_pending: int = 64):
+        self.rounds = rounds
+        self.max_workers = max_workers  # None: one process per CPU
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0  # only touched from the event loop thread
+
+    def configure(self, security_config: dict):
+        # The `security` section of config.yaml; call before start()
+        self.rounds = security_config.get("bcrypt_rounds", self.rounds)
+        self.max_workers = security_config.get("hash_workers", self.max_workers)
+        self.max_pending = security_config.get("hash_queue_limit", self.max_pending)
+
+    def start(self):
+        # Started from inside the event loop, in a process that already runs
+        # threads (the loop's executor, the database pool): forking it could
+        # copy a lock another thread holds. Workers come from a clean server process.
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("forkserver"))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many password operations in progress, retry shortly",
+                                headers={"Retry-After": "1"})
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(verify_password, password, password_hash)
@@ -0,0 +1,4 @@
+-- Enforce unique usernames and role names in the database instead of a SELECT
+-- before every insert. Remove any existing duplicates before running this.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_user_username ON "user" (username);
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_role_name ON role (name);
@@ -3,14 +3,14 @@ from typing import Optional, List
 
 class Role(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    name: str
+    name: str = Field(unique=True, index=True)
     description: Optional[str] = None
     users: List["User"] = Relationship(back_populates="role")  # ✅ Matching name now
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
-    username: str
+    username: str = Field(unique=True, index=True)
     email: str
     password_hash: str
     role_id: Optional[int] = Field(default=None, foreign_key="role.id")
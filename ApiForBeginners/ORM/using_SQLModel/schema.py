@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
+from typing import List, Optional
 
 class UserBase(BaseModel):
     name: str
@@ -25,4 +26,11 @@ class RoleResponse(RoleCreate):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Embedded variants, returned when the caller asks for the related rows
+class UserWithRole(UserResponse):
+    role: Optional[RoleResponse] = None
+
+class RoleWithUsers(RoleResponse):
+    users: List[UserResponse] = []
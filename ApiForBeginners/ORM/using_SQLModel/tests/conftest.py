@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# app.py imports its modules flat and shared helpers from the repository root
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(APP_DIR), str(APP_DIR.parent.parent.parent)]
+
+
+# SQLite leaves foreign keys unchecked unless asked, unlike Postgres
+@event.listens_for(Engine, "connect")
+def enforce_foreign_keys(dbapi_connection, connection_record):
+    if type(dbapi_connection).__module__.startswith("sqlite3"):
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+
+
+@pytest.fixture
+def settings(tmp_path):
+    # A throwaway SQLite file per test, passed straight to create_app()
+    return {"database": {"url": f"sqlite:///{tmp_path / 'users.db'}",
+                         "pool": {"size": 5, "max_overflow": 0}},
+            "security": {"hash_workers": 1}}
+
+
+@pytest.fixture
+def app(settings, monkeypatch):
+    import app as users_app
+
+    # The tests aren't about bcrypt; skip the worker processes' cost
+    async def fake_hash(password):
+        return "hashed:" + password
+    monkeypatch.setattr(users_app.password_hasher, "hash", fake_hash)
+    return users_app.create_app(settings)
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+    from sqlmodel import SQLModel
+
+    with TestClient(app) as client:
+        SQLModel.metadata.create_all(app.state.engine)
+        yield client
@@ -0,0 +1,56 @@
+def new_user(username, role_id):
+    return {"name": "Ada", "username": username, "email": f"{username}@example.com",
+            "password": "secret", "role_id": role_id}
+
+
+def create_role(client, name="admin"):
+    response = client.post("/create_role", json={"name": name, "description": name})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_duplicate_username(client):
+    role_id = create_role(client)
+    assert client.post("/create_user", json=new_user("ada", role_id)).status_code == 201
+    response = client.post("/create_user", json=new_user("ada", role_id))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User already exists"
+
+
+def test_unknown_role(client):
+    role_id = create_role(client)
+    response = client.post("/create_user", json=new_user("ada", role_id + 1))
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Role {role_id + 1} does not exist"
+    # Nothing was written, so the username is still free
+    assert client.post("/create_user", json=new_user("ada", role_id)).status_code == 201
+
+
+def test_duplicate_role(client):
+    create_role(client)
+    response = client.post("/create_role", json={"name": "admin", "description": "again"})
+    assert response.status_code == 400
+
+
+def test_other_unique_violation_is_a_conflict(client, app):
+    from sqlalchemy import text
+
+    # e.g. a deployment that also made emails unique
+    with app.state.engine.begin() as conn:
+        conn.execute(text('CREATE UNIQUE INDEX ix_user_email ON "user" (email)'))
+    role_id = create_role(client)
+    assert client.post("/create_user", json=new_user("ada", role_id)).status_code == 201
+    response = client.post("/create_user", json={**new_user("ada2", role_id), "email": "ada@example.com"})
+    assert response.status_code == 409
+    assert "ada@example.com" not in response.text
+
+
+def test_other_violation_is_a_bad_request(client, app):
+    from sqlalchemy import text
+
+    with app.state.engine.begin() as conn:
+        conn.execute(text('''CREATE TRIGGER reject_root BEFORE INSERT ON "user" WHEN NEW.username = 'root'
+                             BEGIN SELECT RAISE(ABORT, 'CHECK constraint failed: no root'); END'''))
+    response = client.post("/create_user", json=new_user("root", create_role(client)))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User violates a database constraint"
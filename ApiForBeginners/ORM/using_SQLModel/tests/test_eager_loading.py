@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import event, insert
+from models import Role, User
+
+
+@pytest.fixture
+def users(client, app):
+    # 1,000 users across 10 roles, inserted directly to skip hashing
+    with app.state.engine.begin() as conn:
+        conn.execute(insert(Role), [{"id": r, "name": f"role {r}", "description": ""} for r in range(1, 11)])
+        conn.execute(insert(User), [{"name": f"user {i}", "username": f"user{i}", "email": f"user{i}@example.com",
+                                     "password_hash": "x", "role_id": i % 10 + 1} for i in range(1000)])
+
+
+@pytest.fixture
+def selects(app):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+    event.listen(app.state.engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(app.state.engine, "before_cursor_execute", record)
+
+
+def test_users_with_roles(client, users, selects):
+    response = client.get("/users", params={"include_role": "true", "limit": 100})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body) == 100
+    assert all(user["role"]["id"] == user["role_id"] for user in body)
+    assert len(selects) <= 2
+
+
+def test_roles_with_users(client, users, selects):
+    response = client.get("/roles", params={"include": "users"})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body) == 10
+    assert sum(len(role["users"]) for role in body) == 1000
+    assert len(selects) <= 2
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, select
+from hashing import PasswordHasher, verify_password
+from models import User
+
+
+def test_hash_and_verify_in_worker_processes():
+    async def scenario():
+        hasher = PasswordHasher(rounds=4, max_workers=1)
+        hasher.start()
+        try:
+            password_hash = await hasher.hash("correct horse")
+            assert password_hash.startswith("$2b$04$")
+            assert await hasher.verify("correct horse", password_hash)
+            assert not await hasher.verify("wrong horse", password_hash)
+        finally:
+            hasher.shutdown()
+    asyncio.run(scenario())
+
+
+def test_hashes_beyond_max_pending_get_503():
+    async def scenario():
+        hasher = PasswordHasher(rounds=4, max_workers=1, max_pending=1)
+        hasher.start()
+        try:
+            first = asyncio.ensure_future(hasher.hash("one"))
+            await asyncio.sleep(0)  # the first hash is now pending
+            with pytest.raises(HTTPException) as raised:
+                await hasher.hash("two")
+            assert raised.value.status_code == 503
+            assert raised.value.headers == {"Retry-After": "1"}
+            await first
+            # The slot is free again once the first hash is done
+            assert verify_password("three", await hasher.hash("three"))
+        finally:
+            hasher.shutdown()
+    asyncio.run(scenario())
+
+
+def test_create_user_stores_a_real_hash(settings):
+    import app as users_app
+
+    settings["security"] = {"bcrypt_rounds": 4, "hash_workers": 1}
+    with TestClient(users_app.create_app(settings)) as client:
+        SQLModel.metadata.create_all(client.app.state.engine)
+        role_id = client.post("/create_role", json={"name": "admin", "description": ""}).json()["id"]
+        response = client.post("/create_user", json={"name": "Ada", "username": "ada", "email": "ada@example.com",
+                                                      "password": "secret", "role_id": role_id})
+        assert response.status_code == 201
+        with users_app.SessionLocal() as db:
+            user = db.exec(select(User)).one()
+        assert verify_password("secret", user.password_hash)
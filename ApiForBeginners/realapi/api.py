@@ -1,33 +1,54 @@
-from fastapi import FastAPI, HTTPException, status, Response
+from contextlib import asynccontextmanager
+from functools import partial
+from fastapi import FastAPI, APIRouter, HTTPException, status, Response, Depends, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
-import yaml
+from typing import List, Optional
+import asyncio
+import datetime
+import json
+import logging
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import sql
+from pool import ConnectionPool, PoolTimeout
+from cursors import TimedCursor, TimedRealDictCursor
+from events import create_post_events
+from shared.metrics import install_metrics
+from shared.profiling import install_profiling
+from shared.fields import parse_fields
+from shared.settings import get_settings
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
-# Load configuration from YAML file
-with open(r"C:\Users\user\Desktop\ApiDevelopment\ApiTutorial\ApiForBeginners\ORM\config.yaml", "r") as file:
-    config = yaml.safe_load(file)
+# Opens a new physical connection; only the pool calls this
+def connect(db_config: dict):
+    return psycopg2.connect(
+        host=db_config["host"],
+        database=db_config["name"],
+        user=db_config["user"],
+        password=db_config["password"],
+        port=db_config["port"],
+        # Fail a connect to an unreachable server instead of hanging on it
+        connect_timeout=db_config.get("connect_timeout", 10),
+        cursor_factory=TimedCursor
+    )
 
-db_config = config["database"]
-
-# Function to establish a database connection
-def get_db_connection():
+# Dependency: borrow a pooled connection for the duration of the request
+def get_db_connection(request: Request):
+    pool = request.app.state.pool
     try:
-        conn = psycopg2.connect(
-            host=db_config["host"],
-            database=db_config["name"],
-            user=db_config["user"],
-            password=db_config["password"],
-            port=db_config["port"]
-        )
-        print("Connected to the PostgreSQL database")
-        return conn
-    except (Exception, psycopg2.Error) as error:
-        print("Error while connecting to PostgreSQL", error)
-        return None
+        conn = pool.getconn()
+    except (PoolTimeout, psycopg2.Error) as error:
+        # The error names the server, user and auth failure; keep it in the log
+        logger.error("Database connection failed: %s", error)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Database connection failed")
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+router = APIRouter()
 
 # Define Pydantic model for response
 class Post(BaseModel):
@@ -35,28 +56,119 @@ class Post(BaseModel):
     content: str
     published: bool = True
 
-# Route to fetch all posts
-@app.get("/posts") 
-def get_posts():
-    conn = get_db_connection()
-    if conn is None:
-        return {"message": "Database connection failed."}
+# Columns of "Posts" that ?fields= may ask for
+POST_FIELDS = ("id", "title", "content", "published", "created_at")
 
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute('SELECT * FROM public."Posts";')  
+# Route to fetch all posts; ?fields=id,title selects only those columns
+@router.get("/posts") 
+def get_posts(fields: Optional[str] = None, conn=Depends(get_db_connection)):
+    names = parse_fields(fields, POST_FIELDS)
+    cursor = conn.cursor(cursor_factory=TimedRealDictCursor)
+    if names is None:
+        cursor.execute('SELECT * FROM public."Posts";')  
+    else:
+        # Names are checked against POST_FIELDS and quoted as identifiers
+        cursor.execute(sql.SQL('SELECT {} FROM public."Posts";').format(
+            sql.SQL(", ").join(map(sql.Identifier, names))))
     rows = cursor.fetchall()
     cursor.close()
-    conn.close()
 
     return {'message': 'Posts fetched successfully', 'posts': rows}
 
-# Route to create a new post
-@app.post("/posts", status_code=status.HTTP_201_CREATED)
-def create_post(post: Post):
-    conn = get_db_connection()
-    if conn is None:
-        return {"message": "Database connection failed."}
+# Rows fetched from the server-side cursor per round trip
+EXPORT_ITERSIZE = 2000
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# Borrows its own connection: dependencies are cleaned up before a streamed body is sent
+def iter_posts_ndjson(pool):
+    conn = pool.getconn()
+    try:
+        # A named cursor keeps the result set on the server and pulls it in itersize batches
+        with conn.cursor(name="posts_export", cursor_factory=TimedRealDictCursor) as cursor:
+            cursor.itersize = EXPORT_ITERSIZE
+            cursor.execute('SELECT * FROM "Posts" ORDER BY id;')
+            for row in cursor:
+                yield json.dumps(row, default=_json_default) + "\n"
+    finally:
+        pool.putconn(conn)
+
+# Route to export every post as NDJSON in constant memory
+# (declared before /posts/{post_id} so "export" isn't parsed as an id)
+@router.get("/posts/export")
+def export_posts(request: Request):
+    return StreamingResponse(iter_posts_ndjson(request.app.state.pool),
+                             media_type="application/x-ndjson")
+
+# Seconds between SSE comments on an idle stream, so proxies keep it open
+STREAM_KEEPALIVE = 15
+
+# Live create/update/delete events, instead of polling GET /posts. Each event is
+# {"op": "create"|"update"|"delete", "id": ..., "post": {...}} ("post" is absent
+# for deletes). A client that falls too far behind is disconnected and should
+# reconnect and refetch. See events.py.
+@router.get("/posts/stream")
+async def stream_posts(request: Request):
+    subscription = request.app.state.post_events.broker.subscribe()
+
+    async def frames():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    yield "event: overflow\ndata: {}\n\n"
+                    return
+                yield event.sse
+        finally:
+            subscription.close()
+
+    return StreamingResponse(frames(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# The same events as text frames over a WebSocket
+@router.websocket("/posts/ws")
+async def posts_websocket(websocket: WebSocket):
+    await websocket.accept()
+    subscription = websocket.app.state.post_events.broker.subscribe()
+
+    async def forward():
+        while (event := await subscription.get()) is not None:
+            await websocket.send_text(event.text)
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Too far behind")
+
+    async def until_disconnect():
+        # Also notices a client that leaves while no events are flowing
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
 
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(until_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        subscription.close()
+        # Collect how each task ended, so none is left with an unretrieved exception;
+        # sending to a client that has just gone away is expected
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception) and not isinstance(result, WebSocketDisconnect):
+                logger.warning("WebSocket /posts/ws task failed", exc_info=result)
+
+# RETURNING * rows from a plain cursor, keyed by column for the event payload
+def _row_dict(cursor, row) -> dict:
+    return dict(zip((column.name for column in cursor.description), row))
+
+# Route to create a new post
+@router.post("/posts", status_code=status.HTTP_201_CREATED)
+def create_post(post: Post, request: Request, conn=Depends(get_db_connection)):
     cursor = conn.cursor()
     query = '''
         INSERT INTO "Posts" (title, content, published) 
@@ -64,27 +176,21 @@ def create_post(post: Post):
     '''
     cursor.execute(query, (post.title, post.content, post.published))
     new_post = cursor.fetchone()
-    conn.commit()
+    request.app.state.post_events.commit(conn, "create", _row_dict(cursor, new_post))
 
     cursor.close()
-    conn.close()
     
     return {'data': new_post}
 
 # Route to get a single post by ID
-@app.get("/posts/{post_id}")
-def get_post(post_id: int):
-    conn = get_db_connection()
-    if conn is None:
-        return {"message": "Database connection failed."}
-
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+@router.get("/posts/{post_id}")
+def get_post(post_id: int, conn=Depends(get_db_connection)):
+    cursor = conn.cursor(cursor_factory=TimedRealDictCursor)
     query = 'SELECT * FROM "Posts" WHERE id = %s;'
     cursor.execute(query, (post_id,))
     post = cursor.fetchone()
 
     cursor.close()
-    conn.close()
 
     if post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
@@ -92,21 +198,18 @@ def get_post(post_id: int):
     return {'data': post}
 
 # Route to delete a post by ID
-@app.delete("/posts/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_post(post_id: int):
-    conn = get_db_connection()
-    if conn is None:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-                            detail="Database connection failed.")
-
+@router.delete("/posts/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_post(post_id: int, request: Request, conn=Depends(get_db_connection)):
     cursor = conn.cursor()
     query = 'DELETE FROM "Posts" WHERE id = %s RETURNING *;'
     cursor.execute(query, (post_id,))
     deleted_post = cursor.fetchone()
-    conn.commit()
+    if deleted_post is None:
+        conn.commit()
+    else:
+        request.app.state.post_events.commit(conn, "delete", {"id": post_id})
 
     cursor.close()
-    conn.close()
 
     if deleted_post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, 
@@ -115,13 +218,8 @@ def delete_post(post_id: int):
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 # Route to update a post by ID
-@app.put("/posts/{post_id}", status_code=status.HTTP_201_CREATED)
-def update_post(post_id: int, post: Post):
-    conn = get_db_connection()
-    if conn is None:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-                            detail="Database connection failed.")
-
+@router.put("/posts/{post_id}", status_code=status.HTTP_201_CREATED)
+def update_post(post_id: int, post: Post, request: Request, conn=Depends(get_db_connection)):
     cursor = conn.cursor()
     query = '''
         UPDATE "Posts" SET title=%s, content=%s, published=%s 
@@ -129,13 +227,59 @@ def update_post(post_id: int, post: Post):
     '''
     cursor.execute(query, (post.title, post.content, post.published, post_id))
     updated_post = cursor.fetchone()
-    conn.commit()
+    if updated_post is None:
+        conn.commit()
+    else:
+        request.app.state.post_events.commit(conn, "update", _row_dict(cursor, updated_post))
 
     cursor.close()
-    conn.close()
 
     if updated_post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, 
                             detail=f"Post with id {post_id} not found")
     
     return {'data': updated_post}
+
+
+# Settings are read and the pool is opened when the app is created and started,
+# not when this module is imported.
+#   uvicorn api:create_app --factory
+def create_app(settings: Optional[dict] = None) -> FastAPI:
+    settings = get_settings() if settings is None else settings
+    db_config = settings["database"]
+    pool_config = db_config.get("pool", {})
+    # One LISTEN connection (or in-process broker) per worker feeds /posts/stream and /posts/ws
+    post_events = create_post_events(settings.get("events", {}), partial(connect, db_config))
+
+    # The pool is created once per worker at startup and closed on shutdown
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.pool = ConnectionPool(
+            partial(connect, db_config),
+            minconn=pool_config.get("min_size", 1),
+            maxconn=pool_config.get("max_size", 10),
+            max_idle=pool_config.get("max_idle", 300),
+            timeout=pool_config.get("timeout", 30),
+            ping_after=pool_config.get("ping_after", 30),
+        )
+        app.state.post_events = post_events
+        post_events.start()
+        try:
+            yield
+        finally:
+            post_events.stop()
+            app.state.pool.close()
+
+    app = FastAPI(lifespan=lifespan)
+    install_metrics(app)
+    install_profiling(app, settings.get("profiling", {}))
+    app.include_router(router)
+    return app
+
+
+# `uvicorn api:app` keeps working: the app is built on first access
+def __getattr__(name):
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
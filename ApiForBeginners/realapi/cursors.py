@@ -0,0 +1,41 @@
+import time
+import psycopg2.extensions
+from psycopg2.extensions import cursor
+from psycopg2.extras import RealDictCursor
+from shared.metrics import record_db_query
+from shared.profiling import PROFILER
+
+
+# Counts each execute() against the current request for the /metrics endpoint
+# and reports it to the SQL profiler when profiling is enabled
+class _TimedExecuteMixin:
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            seconds = time.perf_counter() - start
+            record_db_query(seconds)
+            if PROFILER.enabled:
+                self._profile(query, vars, seconds)
+
+    def _profile(self, query, vars, seconds):
+        statement = query if isinstance(query, str) else query.as_string(self)
+
+        def explain():
+            # A plain cursor, so the EXPLAIN itself isn't timed and profiled
+            with self.connection.cursor(cursor_factory=psycopg2.extensions.cursor) as plan_cursor:
+                plan_cursor.execute("EXPLAIN ANALYZE " + statement, vars)
+                return [row[0] for row in plan_cursor.fetchall()]
+
+        # Named (server-side) cursors only DECLARE here; their rows arrive later
+        PROFILER.observe(statement, len(vars) if vars else 0, seconds, self.rowcount,
+                         explain=explain if self.name is None else None)
+
+
+class TimedCursor(_TimedExecuteMixin, cursor):
+    pass
+
+
+class TimedRealDictCursor(_TimedExecuteMixin, RealDictCursor):
+    pass
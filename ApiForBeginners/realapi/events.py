@@ -0,0 +1,224 @@
+import asyncio
+import datetime
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads must stay under 8000 bytes; bigger posts are announced by id only
+MAX_NOTIFY_PAYLOAD = 7900
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class PostEvent:
+    """One create/update/delete, encoded once and shared by every subscriber."""
+
+    __slots__ = ("op", "text", "sse")
+
+    def __init__(self, op: str, text: str):
+        self.op = op
+        self.text = text  # {"op": ..., "id": ..., "post": {...}}; sent as-is over WebSockets
+        self.sse = f"event: {op}\ndata: {text}\n\n"
+
+    @classmethod
+    def from_row(cls, op: str, row: dict):
+        # "post" is left out of deletes, and of posts too big for a NOTIFY;
+        # clients fetch those with GET /posts/{id}
+        event = {"op": op, "id": row["id"]}
+        text = json.dumps(event if op == "delete" else {**event, "post": row}, default=_json_default)
+        if len(text.encode()) > MAX_NOTIFY_PAYLOAD:
+            text = json.dumps(event)
+        return cls(op, text)
+
+    @classmethod
+    def from_payload(cls, payload: str):
+        """Raises ValueError unless payload is an event from from_row()."""
+        try:
+            return cls(json.loads(payload)["op"], payload)
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(f"not a post event: {payload[:200]!r}")
+
+
+class Subscription:
+    """A subscriber's bounded buffer. A subscriber that falls `maxsize` events
+    behind is dropped: its buffer is emptied and get() returns None."""
+
+    __slots__ = ("_queue", "_broker")
+
+    def __init__(self, broker, maxsize: int):
+        self._queue = asyncio.Queue(maxsize)
+        self._broker = broker
+
+    async def get(self):
+        return await self._queue.get()
+
+    def _offer(self, event) -> bool:
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+            return False
+
+    def close(self):
+        self._broker._subscribers.discard(self)
+
+
+class Broker:
+    """Fans events out to this worker's subscribers. Runs on the event loop;
+    publish() may be called from any thread."""
+
+    def __init__(self, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self._subscribers = set()
+        self._loop = None
+        self.dropped = 0  # slow consumers disconnected so far
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self, self.buffer_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def publish(self, event: PostEvent):
+        self._loop.call_soon_threadsafe(self.fan_out, event)
+
+    def fan_out(self, event: PostEvent):
+        for subscription in list(self._subscribers):
+            if not subscription._offer(event):
+                self._subscribers.discard(subscription)
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self._subscribers), "dropped": self.dropped}
+
+
+# Handlers commit a write with commit(conn, op, row) instead of conn.commit(),
+# so the event goes out with the transaction and never for one that failed.
+
+class MemoryPostEvents:
+    """In-process delivery: events reach subscribers of this worker only, once
+    the transaction has committed. For tests and single-worker setups."""
+
+    def __init__(self, broker: Broker):
+        self.broker = broker
+
+    def start(self):
+        self.broker.start()
+
+    def stop(self):
+        pass
+
+    def commit(self, conn, op: str, row: dict):
+        conn.commit()
+        self.broker.publish(PostEvent.from_row(op, row))
+
+
+class NotifyPostEvents:
+    """Postgres LISTEN/NOTIFY: handlers pg_notify() inside their transaction, so
+    the event is delivered to every worker exactly when it commits. Each worker
+    holds one listening connection and fans out what arrives on it."""
+
+    def __init__(self, broker: Broker, connect, channel: str = "posts_changes",
+                 reconnect_seconds: float = 1.0):
+        self.broker = broker
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self._connect = connect  # zero-argument callable returning a new connection
+        self._conn = None
+        self._task = None
+        self._stopped = False
+
+    def start(self):
+        self.broker.start()
+        self._task = asyncio.create_task(self._listen())
+
+    def stop(self):
+        self._stopped = True
+        if self._task is not None:
+            self._task.cancel()
+        self._close()
+
+    def _open(self):
+        # Blocking network round trips, run in the default executor
+        conn = self._connect()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}";')
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    async def _listen(self, delay: float = 0):
+        # Connects off the event loop, retrying until it succeeds or stop() is called
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(delay)
+        while True:
+            try:
+                conn = await loop.run_in_executor(None, self._open)
+                break
+            except Exception:
+                logger.exception("LISTEN %s failed; retrying in %ss", self.channel, self.reconnect_seconds)
+            await asyncio.sleep(self.reconnect_seconds)
+        if self._stopped:
+            conn.close()
+            return
+        self._conn = conn
+        # Notifications are read on the event loop as the socket becomes readable
+        loop.add_reader(self._conn.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        try:
+            self._conn.poll()
+        except Exception:
+            logger.exception("Lost the LISTEN connection; reconnecting")
+            self._close()
+            if not self._stopped:
+                self._task = asyncio.create_task(self._listen(self.reconnect_seconds))
+            return
+        while self._conn.notifies:
+            # Anyone can NOTIFY the channel; a bad payload is skipped, not fatal
+            try:
+                event = PostEvent.from_payload(self._conn.notifies.pop(0).payload)
+            except ValueError as error:
+                logger.warning("Ignoring NOTIFY on %s: %s", self.channel, error)
+                continue
+            self.broker.fan_out(event)
+
+    def _close(self):
+        if self._conn is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(self._conn.fileno())
+        except Exception:
+            pass
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    def commit(self, conn, op: str, row: dict):
+        # Queued inside the transaction; Postgres delivers it on COMMIT
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s);", (self.channel, PostEvent.from_row(op, row).text))
+        conn.commit()
+
+
+def create_post_events(events_config: dict, connect):
+    """From the `events` section of config.yaml: backend notify (default) or memory."""
+    broker = Broker(buffer_size=events_config.get("buffer", 100))
+    if events_config.get("backend", "notify") == "memory":
+        return MemoryPostEvents(broker)
+    return NotifyPostEvents(broker, connect, channel=events_config.get("channel", "posts_changes"))
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """A bounded psycopg2 connection pool.
+
+    Connections that sat idle for `ping_after` seconds or more are
+    health-checked when they are checked out; recently used ones are handed
+    out as they are. Idle connections above `minconn` are closed once they
+    have been unused for `max_idle` seconds.
+    """
+
+    def __init__(self, connect, minconn=1, maxconn=10, max_idle=300.0, timeout=30.0,
+                 ping_after=30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("expected 0 <= minconn <= maxconn and maxconn >= 1")
+        self._connect = connect  # zero-argument callable returning a new connection
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.ping_after = ping_after
+
+        self._idle = deque()  # (connection, returned_at), most recently used on the right
+        self._size = 0  # idle + checked out
+        self._closed = False
+        self._cond = threading.Condition()
+
+        for _ in range(minconn):
+            self._size += 1
+            self._idle.append((self._new_connection(), time.monotonic()))
+
+    def _new_connection(self):
+        # Called without the lock held; the caller has already reserved a slot
+        try:
+            return self._connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _discard(self, conn):
+        # Called with the lock held; closing a socket doesn't wait on the server
+        self._size -= 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    @staticmethod
+    def _is_healthy(conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reap_idle(self):
+        # Oldest idle connections sit on the left, so stop at the first fresh one
+        now = time.monotonic()
+        while self._idle and self._size > self.minconn:
+            conn, returned_at = self._idle[0]
+            if now - returned_at < self.max_idle:
+                break
+            self._idle.popleft()
+            self._discard(conn)
+
+    # The lock only guards the bookkeeping. Connecting, the health check and
+    # the rollback on return are network round trips, so they run after the
+    # connection (or a slot for a new one) has been claimed and the lock released.
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed")
+                    self._reap_idle()
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1  # reserve the slot
+                        conn = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No connection available within {self.timeout}s")
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                return self._new_connection()
+            # SELECT 1 and its rollback are two round trips; only pay them for
+            # a connection idle long enough for the server or a proxy to drop it
+            if not conn.closed and time.monotonic() - returned_at < self.ping_after:
+                return conn
+            if self._is_healthy(conn):
+                return conn
+            with self._cond:
+                self._discard(conn)
+                self._cond.notify()
+
+    def putconn(self, conn):
+        healthy = False
+        if not conn.closed:
+            # Never hand a connection with an open transaction to the next caller
+            try:
+                if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                healthy = True
+            except psycopg2.Error:
+                pass
+        with self._cond:
+            if self._closed or not healthy:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._reap_idle()
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max": self.maxconn,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._discard(conn)
+            self._cond.notify_all()
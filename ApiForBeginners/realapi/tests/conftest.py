@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# api.py imports pool/cursors/events flat and shared helpers from the repository root
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(APP_DIR), str(APP_DIR.parent.parent)]
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import socket
+import threading
+import time
+import pytest
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+from api import create_app
+from events import Broker, NotifyPostEvents, PostEvent
+
+
+class FakeListenConnection:
+    """Takes `delay` seconds to connect, like a slow server; NOTIFYs arrive by
+    writing to the other end of its socket."""
+
+    def __init__(self, delay):
+        time.sleep(delay)
+        self.sock, self.peer = socket.socketpair()
+        self.notifies = []
+        self.executed = []
+        self.autocommit = False
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        self.executed.append(query)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def poll(self):
+        payload = self.sock.recv(4096).decode()
+        if not payload:
+            raise ConnectionError("server closed the connection")
+        self.notifies.extend(type("Notify", (), {"payload": line}) for line in payload.splitlines())
+
+    def close(self):
+        self.sock.close()
+        self.peer.close()
+
+
+def test_listen_connects_off_the_event_loop():
+    connections = []
+    def connect():
+        if not connections:
+            connections.append(None)
+            raise ConnectionError("server not up yet")
+        connections.append(FakeListenConnection(delay=0.2))
+        return connections[-1]
+
+    async def scenario():
+        events = NotifyPostEvents(Broker(), connect, reconnect_seconds=0.05)
+        subscription = events.broker.subscribe()
+        started = time.perf_counter()
+        events.start()
+        # The loop keeps running while the failed and the slow connect happen
+        ticks = 0
+        while events._conn is None:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert ticks >= 10
+        assert time.perf_counter() - started >= 0.2
+        assert connections[-1].executed == ['LISTEN "posts_changes";']
+
+        connections[-1].peer.send(json.dumps({"op": "delete", "id": 7}).encode() + b"\n")
+        event = await asyncio.wait_for(subscription.get(), 1)
+        assert event.op == "delete"
+
+        # A dropped connection is replaced, again without blocking the loop
+        connections[-1].peer.close()
+        while events._conn is None or events._conn is connections[1]:
+            await asyncio.sleep(0.01)
+        assert len(connections) == 3
+        events.stop()
+
+    asyncio.run(scenario())
+
+
+def test_malformed_notify_is_skipped(caplog):
+    connections = []
+
+    def connect():
+        connections.append(FakeListenConnection(delay=0))
+        return connections[-1]
+
+    async def scenario():
+        events = NotifyPostEvents(Broker(), connect)
+        subscription = events.broker.subscribe()
+        events.start()
+        while events._conn is None:
+            await asyncio.sleep(0.01)
+        good = json.dumps({"op": "delete", "id": 7})
+        connections[0].peer.send(b"not json\n[1]\n{}\n" + good.encode() + b"\n")
+        event = await asyncio.wait_for(subscription.get(), 1)
+        # The listener survived and is still the same connection
+        assert events._conn is connections[0]
+        events.stop()
+        return event
+
+    with caplog.at_level(logging.WARNING, logger="events"):
+        event = asyncio.run(scenario())
+    assert event.text == json.dumps({"op": "delete", "id": 7})
+    assert len([record for record in caplog.records if "Ignoring NOTIFY" in record.getMessage()]) == 3
+
+
+def test_slow_subscriber_is_dropped_without_holding_up_others():
+    async def scenario():
+        broker = Broker(buffer_size=3)
+        broker.start()
+        fast, slow = broker.subscribe(), broker.subscribe()
+        received = []
+        for n in range(5):
+            broker.fan_out(PostEvent.from_row("delete", {"id": n}))
+            received.append(await fast.get())
+        return broker, received, await slow.get(), slow
+
+    broker, received, slow_event, slow = asyncio.run(scenario())
+    assert [json.loads(event.text)["id"] for event in received] == [0, 1, 2, 3, 4]
+    # The slow one fell 4 behind a buffer of 3: emptied, told so, and unsubscribed
+    assert slow_event is None
+    assert slow._queue.empty()
+    assert broker.stats() == {"subscribers": 1, "dropped": 1}
+
+
+class CommitOnly:
+    def commit(self):
+        pass
+
+
+def test_events_fan_out_to_sse_and_websocket_clients():
+    settings = {"database": {"pool": {"min_size": 0}}, "events": {"backend": "memory", "buffer": 2}}
+    app = create_app(settings)
+    post_events = None
+
+    def wait_for_subscribers(count):
+        deadline = time.monotonic() + 5
+        while post_events.broker.stats()["subscribers"] < count:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    with TestClient(app) as client:
+        post_events = app.state.post_events
+        with client.websocket_connect("/posts/ws") as websocket:
+            wait_for_subscribers(1)
+            # The test client returns an SSE body once the stream ends, so read it in a thread
+            sse = {}
+            reader = threading.Thread(target=lambda: sse.update(body=client.get("/posts/stream").text))
+            reader.start()
+            wait_for_subscribers(2)
+
+            post_events.commit(CommitOnly(), "create", {"id": 1, "title": "one"})
+            post_events.commit(CommitOnly(), "delete", {"id": 1})
+            assert json.loads(websocket.receive_text()) == {"op": "create", "id": 1,
+                                                            "post": {"id": 1, "title": "one"}}
+            assert json.loads(websocket.receive_text()) == {"op": "delete", "id": 1}
+
+            # A burst bigger than the buffer, all at once: both clients are too far behind
+            burst = [PostEvent.from_row("delete", {"id": n}) for n in range(3)]
+            post_events.broker._loop.call_soon_threadsafe(
+                lambda: [post_events.broker.fan_out(event) for event in burst])
+            with pytest.raises(WebSocketDisconnect) as closed:
+                while True:
+                    websocket.receive_text()
+            assert closed.value.code == 1008
+            reader.join(5)
+
+        assert sse["body"] == (": connected\n\n"
+                               'event: create\ndata: {"op": "create", "id": 1, "post": {"id": 1, "title": "one"}}\n\n'
+                               'event: delete\ndata: {"op": "delete", "id": 1}\n\n'
+                               "event: overflow\ndata: {}\n\n")
+        assert post_events.broker.stats() == {"subscribers": 0, "dropped": 2}
@@ -0,0 +1,165 @@
+import threading
+import time
+import types
+import psycopg2
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+from fastapi import HTTPException
+from api import get_db_connection
+from pool import ConnectionPool, PoolTimeout
+
+
+class FailingPool:
+    def getconn(self):
+        raise psycopg2.OperationalError(
+            'connection to server at "db.internal" (10.0.0.5), port 5432 failed: '
+            'FATAL:  password authentication failed for user "postgres"')
+
+
+def test_connection_error_is_not_sent_to_the_client(caplog):
+    request = types.SimpleNamespace(app=types.SimpleNamespace(state=types.SimpleNamespace(pool=FailingPool())))
+    with pytest.raises(HTTPException) as raised:
+        next(get_db_connection(request))
+    assert raised.value.status_code == 503
+    assert raised.value.detail == "Database connection failed"
+    assert "password authentication failed" in caplog.text
+
+
+class FakeConnection:
+    """Stands in for a psycopg2 connection: every round trip takes `latency`
+    seconds and is counted."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.closed = 0
+        self.broken = False
+        self.in_transaction = False
+        self.round_trips = []
+
+    def _round_trip(self, name):
+        time.sleep(self.latency)
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.round_trips.append(name)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self._round_trip("ROLLBACK")
+        self.in_transaction = False
+
+    def get_transaction_status(self):
+        return TRANSACTION_STATUS_INTRANS if self.in_transaction else TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        self.conn._round_trip(query)
+        self.conn.in_transaction = True
+
+
+class Factory:
+    def __init__(self, latency=0.0, failures=0):
+        self.latency = latency
+        self.failures = failures
+        self.made = []
+
+    def __call__(self):
+        time.sleep(self.latency)
+        if self.failures:
+            self.failures -= 1
+            raise psycopg2.OperationalError("could not connect to server")
+        self.made.append(FakeConnection())
+        return self.made[-1]
+
+
+def test_connects_run_outside_the_lock():
+    factory = Factory(latency=0.2)
+    pool = ConnectionPool(factory, minconn=0, maxconn=8)
+    started = time.perf_counter()
+    threads = [threading.Thread(target=pool.getconn) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Eight 200 ms connects in parallel, not one after another
+    assert time.perf_counter() - started < 0.8
+    assert pool.stats() == {"size": 8, "idle": 0, "in_use": 8, "max": 8}
+
+
+def test_failed_connect_gives_its_slot_back():
+    pool = ConnectionPool(Factory(failures=2), minconn=0, maxconn=1, timeout=0.1)
+    for _ in range(2):
+        with pytest.raises(psycopg2.OperationalError):
+            pool.getconn()
+        assert pool.stats()["size"] == 0
+    conn = pool.getconn()
+    assert pool.stats() == {"size": 1, "idle": 0, "in_use": 1, "max": 1}
+    pool.putconn(conn)
+
+
+def test_recently_used_connections_are_not_pinged():
+    pool = ConnectionPool(Factory(), minconn=1, maxconn=1, ping_after=60)
+    conn = pool.getconn()
+    cursor = conn.cursor()
+    with cursor:
+        cursor.execute("SELECT 42")
+    pool.putconn(conn)  # rolls back the open transaction
+    assert pool.getconn() is conn
+    pool.putconn(conn)  # nothing to roll back
+    assert conn.round_trips == ["SELECT 42", "ROLLBACK"]
+
+
+def test_idle_connection_is_pinged_and_replaced_if_dead():
+    factory = Factory()
+    pool = ConnectionPool(factory, minconn=1, maxconn=1, ping_after=0.05)
+    time.sleep(0.06)
+    first = factory.made[0]
+    assert pool.getconn() is first
+    assert first.round_trips == ["SELECT 1", "ROLLBACK"]
+    pool.putconn(first)
+
+    time.sleep(0.06)
+    first.broken = True  # e.g. dropped by a proxy's idle timeout
+    conn = pool.getconn()
+    assert conn is factory.made[1]
+    assert first.closed
+    assert pool.stats() == {"size": 1, "idle": 0, "in_use": 1, "max": 1}
+
+
+def test_surplus_idle_connections_are_reaped():
+    pool = ConnectionPool(Factory(), minconn=1, maxconn=3, max_idle=0.05)
+    conns = [pool.getconn() for _ in range(3)]
+    for conn in conns:
+        pool.putconn(conn)
+    assert pool.stats()["size"] == 3
+    time.sleep(0.06)
+    conn = pool.getconn()
+    assert pool.stats() == {"size": 1, "idle": 0, "in_use": 1, "max": 3}
+    assert sum(1 for c in conns if c.closed) == 2
+
+
+def test_checkout_times_out_and_is_woken_by_putconn():
+    pool = ConnectionPool(Factory(), minconn=0, maxconn=1, timeout=0.1)
+    conn = pool.getconn()
+    started = time.perf_counter()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert 0.1 <= time.perf_counter() - started < 0.5
+
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+    pool.timeout = 5
+    assert pool.getconn() is conn
@@ -0,0 +1,79 @@
+import datetime
+import json
+from api import EXPORT_ITERSIZE, iter_posts_ndjson
+
+
+class FakeNamedCursor:
+    """Hands out rows one at a time, like a server-side cursor, and records how
+    far the consumer has pulled."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.pulled = 0
+        self.itersize = None
+        self.query = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, vars=None):
+        self.query = query
+
+    def __iter__(self):
+        for row in self.rows:
+            self.pulled += 1
+            yield row
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.cursor_name = None
+        self.named_cursor = FakeNamedCursor(rows)
+
+    def cursor(self, name=None, cursor_factory=None):
+        self.cursor_name = name
+        return self.named_cursor
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.returned = False
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn):
+        self.returned = True
+
+
+def make_rows(count):
+    created = datetime.datetime(2026, 1, 1)
+    for i in range(count):
+        yield {"id": i, "title": f"post {i}", "content": "x", "published": True, "created_at": created}
+
+
+def test_ndjson_lines_match_rows():
+    pool = FakePool(FakeConnection(list(make_rows(3))))
+    lines = list(iter_posts_ndjson(pool))
+    assert [json.loads(line) for line in lines] == [
+        {"id": i, "title": f"post {i}", "content": "x", "published": True,
+         "created_at": "2026-01-01T00:00:00"} for i in range(3)]
+    assert all(line.endswith("\n") for line in lines)
+    assert pool.returned
+
+
+def test_export_streams_from_a_named_cursor():
+    conn = FakeConnection(make_rows(100_000))
+    pool = FakePool(conn)
+    export = iter_posts_ndjson(pool)
+    next(export)
+    # Rows are read as they are sent, not loaded up front
+    assert conn.cursor_name is not None
+    assert conn.named_cursor.itersize == EXPORT_ITERSIZE
+    assert conn.named_cursor.pulled == 1
+    export.close()
+    assert pool.returned
@@ -0,0 +1,11 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+# Bound to the asyncpg engine created in the app's lifespan when `async: true`
+# is set under `database` in config.yaml (see main.create_app).
+# expire_on_commit=False: attributes can't be lazily refreshed in async code,
+# so keep the loaded values around after commit for the response model
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
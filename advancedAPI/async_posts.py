@@ -0,0 +1,100 @@
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status, Query, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from typing import Optional
+from models import Post
+from schema import PostCreate, PostResponse, PostUpdate, PostPatch, PostPage
+from pagination import MAX_PAGE_SIZE
+from async_database import get_async_db
+from changes import post_changed
+from loader import parse_ids, posts_by_ids_response
+from shared.fields import parse_fields
+from etag import post_etag
+from responses import cached_post, render_post, page_columns, page_query, render_post_page
+from mutations import (create_post_statement, update_post_statement, delete_post_statement,
+                       post_exists_statement, mutation_error)
+
+# async def versions of the /posts routes in main.py. Each request awaits the
+# database instead of holding a threadpool worker, so a single process can keep
+# many more requests in flight.
+# Ids use the :int convertor so sibling routes such as /posts/export still reach main.py.
+router = APIRouter()
+
+@router.post("/posts", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
+async def create_post(post: PostCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        new_post = (await db.execute(create_post_statement(post.model_dump()))).one()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Post already exists")
+    post_changed(new_post.id)
+    return new_post._asdict()
+
+@router.get("/posts", response_model=PostPage, status_code=status.HTTP_200_OK)
+async def get_post(request: Request, response: Response, db: AsyncSession = Depends(get_async_db),
+                   limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                   cursor: Optional[str] = None,
+                   if_none_match: Optional[str] = Header(None),
+                   fields: Optional[str] = None,
+                   ids: Optional[str] = None):
+    # ?fields=id,title selects and returns only those columns; the default is unchanged
+    names = parse_fields(fields, PostResponse.model_fields)
+    if ids is not None:
+        rows = await request.app.state.post_loader.load_many(parse_ids(ids))
+        return posts_by_ids_response(rows, names, if_none_match)
+    columns = page_columns(names)
+    query = page_query(cursor, limit, columns)
+    posts = (await (db.scalars(query) if columns is None else db.execute(query))).all()
+    return render_post_page(posts, limit, columns, names, if_none_match, response)
+
+@router.get("/posts/{post_id:int}", response_model=PostResponse, status_code=status.HTTP_200_OK)
+async def get_post_by_id(post_id: int, db: AsyncSession = Depends(get_async_db),
+                         if_none_match: Optional[str] = Header(None)):
+    response, token = cached_post(post_id, if_none_match)
+    if response is not None:
+        return response
+    return render_post(await db.get(Post, post_id), token, if_none_match)
+
+async def apply_post_update(db: AsyncSession, id: int, changes: dict, if_match: Optional[str],
+                            response: Response) -> dict:
+    try:
+        post = (await db.execute(update_post_statement(id, changes, if_match))).first()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Post already exists")
+    if post is None:
+        await db.rollback()
+        raise mutation_error(if_match is not None and await db.scalar(post_exists_statement(id)) is not None)
+    await db.commit()
+    post_changed(id)
+    response.headers["ETag"] = post_etag(post.id, post.version)
+    return post._asdict()
+
+@router.put("/posts/{id:int}", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
+async def update_post(id: int, updated_post: PostUpdate, response: Response,
+                      db: AsyncSession = Depends(get_async_db),
+                      if_match: Optional[str] = Header(None)):
+    return await apply_post_update(db, id, updated_post.model_dump(), if_match, response)
+
+@router.patch("/posts/{id:int}", response_model=PostResponse, status_code=status.HTTP_200_OK)
+async def patch_post(id: int, patch: PostPatch, response: Response,
+                     db: AsyncSession = Depends(get_async_db),
+                     if_match: Optional[str] = Header(None)):
+    changes = patch.model_dump(exclude_unset=True, exclude_none=True)
+    if not changes:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields to update")
+    return await apply_post_update(db, id, changes, if_match, response)
+
+@router.delete("/posts/{id:int}", response_model=PostResponse, status_code=status.HTTP_200_OK)
+async def delete_post(id: int, db: AsyncSession = Depends(get_async_db),
+                      if_match: Optional[str] = Header(None)):
+    deleted = (await db.execute(delete_post_statement(id, if_match))).first()
+    if deleted is None:
+        await db.rollback()
+        raise mutation_error(if_match is not None and await db.scalar(post_exists_statement(id)) is not None)
+    await db.commit()
+    post_changed(id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,61 @@
+"""Creating many posts: one POST /posts per post versus a single POST
+/posts/bulk, through the app on a throwaway SQLite database. A second bulk
+request with the same titles measures the all-duplicates path. Run from the
+repository root:
+
+    python advancedAPI/benchmarks/bench_bulk_create.py [posts]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(APP_DIR), str(APP_DIR.parent)]
+from fastapi.testclient import TestClient  # noqa: E402
+from database import Base  # noqa: E402
+import main  # noqa: E402
+
+
+def timed(directory, name, send):
+    """Seconds taken by send(client) against a new, empty database."""
+    app = main.create_app({"database": {"url": f"sqlite:///{directory}/{name}.db"}})
+    with TestClient(app) as client:
+        Base.metadata.create_all(app.state.engine)
+        start = time.perf_counter()
+        send(client)
+        return time.perf_counter() - start
+
+
+def single(posts):
+    def send(client):
+        for post in posts:
+            assert client.post("/posts", json=post).status_code == 201
+    return send
+
+
+def bulk(posts, repeats=1):
+    def send(client):
+        for _ in range(repeats):
+            assert client.post("/posts/bulk", json=posts).status_code == 200
+    return send
+
+
+def run():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    posts = [{"title": f"post {n}", "content": "lorem ipsum " * 20} for n in range(count)]
+    with tempfile.TemporaryDirectory() as directory:
+        one_by_one = timed(directory, "single", single(posts))
+        batched = timed(directory, "bulk", bulk(posts))
+        # The second request finds every title taken
+        duplicates = timed(directory, "duplicates", bulk(posts, repeats=2)) - batched
+
+    print(f"{count} posts")
+    print(f"  POST /posts x {count}:       {one_by_one:8.2f} s  ({count / one_by_one:8.0f} posts/s)")
+    print(f"  POST /posts/bulk:            {batched:8.2f} s  ({count / batched:8.0f} posts/s)"
+          f"  {one_by_one / batched:.0f}x")
+    print(f"  POST /posts/bulk, all dupes: {duplicates:8.2f} s  ({count / duplicates:8.0f} posts/s)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,91 @@
+"""GET /posts on a large table: the old unpaginated read (every row through
+PostResponse) versus keyset pagination, for the first and the last page, with
+OFFSET shown for comparison. Seeds a throwaway SQLite database. Run from the
+repository root:
+
+    python advancedAPI/benchmarks/bench_pagination.py [rows] [page_size]
+"""
+import datetime
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(APP_DIR), str(APP_DIR.parent)]
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from database import Base  # noqa: E402
+from models import Post  # noqa: E402
+from pagination import encode_cursor  # noqa: E402
+from schema import PostResponse  # noqa: E402
+import main  # noqa: E402
+
+
+def seed(engine, rows):
+    start = datetime.datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        for first in range(0, rows, 50_000):
+            conn.execute(insert(Post), [
+                {"title": f"post {n}", "content": "lorem ipsum " * 20, "published": True, "version": 1,
+                 "created_at": start + datetime.timedelta(seconds=n), "updated_at": start}
+                for n in range(first, min(first + 50_000, rows))])
+
+
+def median_ms(call, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def run():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    last_page = rows // page_size
+    with tempfile.TemporaryDirectory() as directory:
+        app = main.create_app({"database": {"url": f"sqlite:///{directory}/posts.db"}})
+        with TestClient(app) as client:
+            engine = app.state.engine
+            Base.metadata.create_all(engine)
+            started = time.perf_counter()
+            seed(engine, rows)
+            print(f"seeded {rows} posts in {time.perf_counter() - started:.1f} s; pages of {page_size}")
+
+            # Before: db.query(Post).all(), every row validated for the response
+            def read_everything():
+                with Session(engine) as db:
+                    [PostResponse.model_validate(post) for post in db.scalars(select(Post)).all()]
+
+            # The cursor the client would hold after paging through to the last page
+            with Session(engine) as db:
+                before_last = db.execute(select(Post.created_at, Post.id)
+                                         .order_by(Post.created_at.desc(), Post.id.desc())
+                                         .offset((last_page - 1) * page_size - 1).limit(1)).one()
+            cursor = encode_cursor(*before_last)
+
+            def page(params):
+                response = client.get("/posts", params={"limit": page_size, **params})
+                assert response.status_code == 200 and len(response.json()["items"]) == page_size
+
+            def offset_page():
+                with Session(engine) as db:
+                    db.scalars(select(Post).order_by(Post.created_at.desc(), Post.id.desc())
+                               .offset((last_page - 1) * page_size).limit(page_size)).all()
+
+            results = [
+                ("before: all rows, unpaginated", median_ms(read_everything, 1)),
+                ("keyset: page 1", median_ms(lambda: page({}), 50)),
+                (f"keyset: page {last_page}", median_ms(lambda: page({"cursor": cursor}), 50)),
+                (f"OFFSET: page {last_page} (query only)", median_ms(offset_page, 5)),
+            ]
+    for name, ms in results:
+        print(f"  {name:<36} {ms:10.1f} ms")
+
+
+if __name__ == "__main__":
+    run()
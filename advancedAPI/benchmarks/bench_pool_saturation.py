@@ -0,0 +1,70 @@
+"""Connection pool under saturation: more concurrent requests than pooled
+connections, each holding its connection for a fixed time (standing in for a
+query). Prints throughput and the wait metrics GET /db/pool reports, per pool
+size, so pool.size can be chosen from them. Run from the repository root:
+
+    python advancedAPI/benchmarks/bench_pool_saturation.py [workers] [requests] [hold_ms]
+"""
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path[:0] = [str(Path(__file__).resolve().parent.parent.parent)]
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError  # noqa: E402
+from shared.engine import create_engine_from_config, pool_metrics  # noqa: E402
+
+
+def run(url, size, workers, requests, hold):
+    engine = create_engine_from_config({"url": url, "pool": {"size": size, "max_overflow": 0,
+                                                             "timeout": 5, "pre_ping": False}})
+    # Open every connection first, so only waiting is measured
+    connections = [engine.connect() for _ in range(size)]
+    for conn in connections:
+        conn.close()
+    engine.pool.wait_count = engine.pool.wait_seconds = 0
+    engine.pool.wait_buckets = [0] * len(engine.pool.wait_buckets)
+    failed = []
+
+    def worker():
+        for _ in range(requests):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("select 1"))
+                    time.sleep(hold)
+            except PoolTimeoutError:
+                failed.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    metrics = pool_metrics(engine)
+    engine.dispose()
+    return elapsed, metrics, len(failed)
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    hold = (float(sys.argv[3]) if len(sys.argv) > 3 else 10) / 1000
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{directory}/pool.db"
+        print(f"{workers} workers x {requests} requests, each holding a connection {hold * 1000:.0f} ms")
+        print(f"{'pool':>5} {'req/s':>8} {'mean wait ms':>13} {'waits > 50ms':>13} {'timeouts':>9}")
+        for size in (5, 10, 25, 50):
+            elapsed, metrics, failed = run(url, size, workers, requests, hold)
+            histogram = metrics["wait_histogram"]
+            slow = histogram["+Inf"] - histogram["0.05"]
+            print(f"{size:>5} {workers * requests / elapsed:>8.0f} "
+                  f"{metrics['wait_seconds_total'] / metrics['wait_count'] * 1000:>13.1f} "
+                  f"{slow:>13} {failed:>9}")
+
+
+if __name__ == "__main__":
+    main()
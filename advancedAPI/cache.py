@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class CacheBackend:
+    """Interface for response caches. A shared backend such as Redis only needs
+    these methods (bytes in, bytes out) to replace the in-process LRU."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def fill_token(self, key: str) -> int:
+        """Taken on a miss, before reading the value from the database. set()
+        with this token is skipped if `key` was deleted in the meantime, so a
+        slow read can't put back a value a writer has just invalidated."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, token: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """Thread-safe in-process LRU cache with a size bound and per-entry TTL.
+
+    delete() leaves a tombstone stamped with a new generation number; it
+    counts towards maxsize and lives for one TTL, like any entry. Once a
+    tombstone is evicted or expires, fills with a token older than it are
+    skipped for every key, since the cache no longer knows which key it was.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expires_at, value or None for a tombstone, generation), least recently used first
+        self._data = OrderedDict()
+        self._generation = 0
+        self._forgotten = 0  # newest generation among entries dropped from _data
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] is None or entry[0] < time.monotonic():
+                if entry is not None and entry[0] < time.monotonic():
+                    self._drop(key)  # expired
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def fill_token(self, key):
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, token=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if token is not None and (entry[2] if entry is not None else self._forgotten) > token:
+                return  # deleted (or refilled) after this value was read
+            self._store(key, value, self._generation if token is None else token)
+
+    def delete(self, key):
+        with self._lock:
+            self._generation += 1
+            self._store(key, None, self._generation)
+
+    def _store(self, key, value, generation):
+        self._data[key] = (time.monotonic() + self.ttl, value, generation)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        self._forgotten = max(self._forgotten, self._data.pop(key)[2])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+def post_cache_key(post_id: int) -> str:
+    return f"post:{post_id}"
+
+# Cached posts are stored as the ETag line followed by the JSON body
+def pack_post(etag: str, body: bytes) -> bytes:
+    return etag.encode() + b"\n" + body
+
+def unpack_post(entry: bytes):
+    etag, body = entry.split(b"\n", 1)
+    return etag.decode(), body
+
+
+# pack_post() entries keyed by post_cache_key(); written by
+# GET /posts/{id} and dropped by every route that changes or deletes a post.
+# Sized from config.yaml by configure_cache() when the app is created.
+post_cache: CacheBackend = LRUCache()
+
+def configure_cache(cache_config: dict):
+    post_cache.maxsize = cache_config.get("maxsize", post_cache.maxsize)
+    post_cache.ttl = cache_config.get("ttl", post_cache.ttl)
@@ -0,0 +1,49 @@
+from typing import Optional
+from sqlalchemy import select, tuple_, func, cast, BigInteger, String
+from models import Post, PostChange
+from pagination import encode_token, decode_token
+from serialization import POST_COLUMNS
+
+# Upper bound for ?limit= on GET /posts/changes
+MAX_CHANGES_BATCH = 1000
+
+# GET /posts/changes?since= returns post_changes rows in (txid, seq) order,
+# each with the post as it is now (null once deleted), and a cursor to resume
+# from. Sequence numbers are handed out when a row is written, not when its
+# transaction commits, so a plain `seq > since` could skip a change that
+# commits after a later one was already served. On Postgres the feed only
+# goes up to the oldest transaction still running (the snapshot's xmin):
+# everything below it has finished, so nothing can later appear behind the
+# cursor. On SQLite there is one writer at a time and seq order is commit order.
+
+def _snapshot_xmin():
+    return cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), String), BigInteger)
+
+def changes_query(after: Optional[tuple], limit: int, dialect: str):
+    post_columns = [column.label(f"current_{column.key}") for column in POST_COLUMNS]
+    query = (select(PostChange.seq, PostChange.txid, PostChange.post_id, PostChange.op, *post_columns)
+             .outerjoin(Post, Post.id == PostChange.post_id)
+             .order_by(PostChange.txid, PostChange.seq))
+    if after is not None:
+        query = query.where(tuple_(PostChange.txid, PostChange.seq) > after)
+    if dialect == "postgresql":
+        query = query.where(PostChange.txid < _snapshot_xmin())
+    # Fetch one extra row to know whether more changes are waiting
+    return query.limit(limit + 1)
+
+def changes_page(db, since: Optional[str], limit: int) -> dict:
+    after = decode_token(since, int, int) if since is not None else None
+    rows = db.execute(changes_query(after, limit, db.get_bind().dialect.name)).all()
+    changes = [{
+        "seq": row.seq,
+        "post_id": row.post_id,
+        "op": row.op,
+        # The current state, not the one at the time of the change: an
+        # indexer only needs to converge on the latest version
+        "post": None if row.current_id is None else
+                {column.key: getattr(row, f"current_{column.key}") for column in POST_COLUMNS},
+    } for row in rows[:limit]]
+    last = rows[min(len(rows), limit) - 1] if rows else None
+    # An empty batch resumes where it was asked to
+    next_cursor = encode_token([last.txid, last.seq]) if last is not None else since
+    return {"changes": changes, "next_cursor": next_cursor, "has_more": len(rows) > limit}
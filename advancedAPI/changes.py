@@ -0,0 +1,8 @@
+from cache import post_cache, post_cache_key
+from search import search_index
+
+# Called after a write that touches a post has committed, so every derived copy
+# of it (the response cache, the in-memory search index) is dropped or refreshed
+def post_changed(post_id: int):
+    post_cache.delete(post_cache_key(post_id))
+    search_index.mark_dirty(post_id)
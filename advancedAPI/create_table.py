@@ -0,0 +1,18 @@
+from database import Base
+from models import Post
+from shared.engine import create_engine_from_config
+from shared.settings import get_settings
+
+# Creates the posts table (and the indexes declared on the model). Run once per
+# database, before starting the app; later schema changes live in migrations/.
+#   PYTHONPATH=.. python create_table.py
+def create_db_and_tables():
+    engine = create_engine_from_config(get_settings()["database"])
+    try:
+        Base.metadata.create_all(bind=engine)
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    create_db_and_tables()
+    print("Tables created successfully.")
@@ -1,18 +1,11 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import yaml
+from fastapi import Request
+from shared.replicas import pinned_to_primary
 
-with open(r"C:\Users\user\Desktop\ApiDevelopment\ApiTutorial\ApiForBeginners\ORM\config.yaml", "r") as file:
-    config = yaml.safe_load(file)
-
-db_config = config["database"]
-
-SQLALCHEMY_DATABASE_URI = (f"postgresql://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['name']}")
-
-engine = create_engine(SQLALCHEMY_DATABASE_URI)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Not bound at import: the app's lifespan creates the engine from config.yaml
+# and binds it with SessionLocal.configure(bind=engine) (see main.create_app)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
 def get_db():
@@ -20,4 +13,13 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# For GET handlers: a session on a read replica (app.state.replicas, see
+# shared/replicas.py), or on the primary for clients that just wrote
+def get_read_db(request: Request):
+    db = SessionLocal(bind=request.app.state.replicas.read_engine(pinned_to_primary(request)))
+    try:
+        yield db
+    finally:
+        db.close()
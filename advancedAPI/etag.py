@@ -0,0 +1,38 @@
+import hashlib
+from typing import Iterable, List, Optional
+
+# A post's ETag changes whenever its version column is bumped, so it can be
+# checked against a request header without serializing the post.
+def post_etag(post_id: int, version: int) -> str:
+    return f'"{post_id}-{version}"'
+
+# A page of posts is identified by the ids and versions it contains
+def list_etag(posts: Iterable, extra: str = "") -> str:
+    digest = hashlib.sha1(extra.encode())
+    for post in posts:
+        digest.update(f"{post.id}-{post.version},".encode())
+    return f'"{digest.hexdigest()}"'
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # W/ prefixes are ignored: If-None-Match uses the weak comparison (RFC 9110)
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+# If-Match on PUT/PATCH/DELETE: the versions of `post_id` the client says it has
+# seen, for the mutation's WHERE clause (see mutations.py). None means any
+# version will do (no header, or "*"); an empty list matches nothing. If-Match
+# uses the strong comparison (RFC 9110), so weak W/ tags never match.
+def if_match_versions(header: Optional[str], post_id: int) -> Optional[List[int]]:
+    if header is None or header.strip() == "*":
+        return None
+    prefix = f'"{post_id}-'
+    versions = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        version = tag[len(prefix):-1]
+        if tag.startswith(prefix) and tag.endswith('"') and version.isdigit():
+            versions.append(int(version))
+    return versions
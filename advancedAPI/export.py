@@ -0,0 +1,42 @@
+import csv
+import datetime
+import io
+import json
+from sqlalchemy import select
+from models import Post
+
+# Rows pulled from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 2000
+
+EXPORT_COLUMNS = ["id", "title", "content", "published", "created_at"]
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# Each generator opens its own session: the request's get_db session is closed
+# before a StreamingResponse body is sent.
+def _stream_rows(session_factory):
+    query = (select(*(getattr(Post, column) for column in EXPORT_COLUMNS))
+             .order_by(Post.id)
+             .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+    with session_factory() as db:
+        for row in db.execute(query).mappings():
+            yield row
+
+def iter_ndjson(session_factory):
+    for row in _stream_rows(session_factory):
+        yield json.dumps(dict(row), default=_json_default) + "\n"
+
+def iter_csv(session_factory):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in _stream_rows(session_factory):
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        # Hand the line(s) to the client and reuse the buffer
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, Request, status
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from models import Post
+from schema import PostCreate, PostResponse
+from changes import post_changed
+from shared.replicas import record_write
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitter:
+    """Coalesces concurrent single-post inserts into shared transactions.
+
+    Each create request queues its values and awaits its own future. One
+    writer task takes up to `max_batch` queued posts, waiting at most
+    `max_delay` seconds after the first one for more, writes them with a single
+    multi-row INSERT ... RETURNING and commits once, so a burst of N creates
+    costs one WAL flush instead of N. If the batch fails, it is replayed one
+    post per SAVEPOINT, so only the posts that caused the failure get an error.
+
+    At most `max_pending` posts may wait to be written; beyond that callers get
+    a 503 instead of piling up in memory.
+    """
+
+    def __init__(self, session_factory, max_batch: int = 100, max_delay: float = 0.005,
+                 max_pending: int = 1000):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._queue = None
+        self._writer = None
+        self._closing = False
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Refuse new posts, let the queued ones be written, then stop the writer
+        self._closing = True
+        await self._queue.join()
+        self._writer.cancel()
+
+    async def submit(self, values: dict):
+        """Queue one post; returns its (id, created_at) row once committed."""
+        if self._closing:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Server is shutting down")
+        if self._writer.done():
+            raise self._stopped()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((values, future))
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many posts waiting to be written, retry shortly",
+                                headers={"Retry-After": "1"})
+        return await future
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = await self._next_batch()
+                try:
+                    # The session is synchronous; keep it off the event loop
+                    results = await loop.run_in_executor(None, self._write, [values for values, _ in batch])
+                    for (_, future), result in zip(batch, results):
+                        self._settle(future, result)
+                except Exception as error:
+                    logger.exception("Group commit of %d posts failed", len(batch))
+                    for _, future in batch:
+                        self._settle(future, error)
+                finally:
+                    # Reached on cancellation too, so no caller of this batch is left waiting
+                    for _, future in batch:
+                        self._settle(future, self._stopped())
+                        self._queue.task_done()
+        finally:
+            # The writer is gone: fail whatever is still queued instead of
+            # leaving it to hang, and let stop()'s join() return
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                self._settle(future, self._stopped())
+                self._queue.task_done()
+
+    def _settle(self, future: asyncio.Future, result):
+        if not isinstance(result, Exception):
+            # Invalidated here, not by the caller: one that went away has a
+            # cancelled future, but its post is still written
+            try:
+                post_changed(result.id)
+            except Exception:
+                logger.exception("Invalidating post %s failed", result.id)
+        if future.done():
+            return
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    @staticmethod
+    def _stopped() -> HTTPException:
+        return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                             detail="Post writer stopped, retry shortly", headers={"Retry-After": "1"})
+
+    def _write(self, rows: list) -> list:
+        # RETURNING rows come back in the order of `rows`, so they line up with the callers
+        statement = insert(Post).returning(Post.id, Post.created_at, sort_by_parameter_order=True)
+        with self.session_factory() as db:
+            try:
+                created = db.execute(statement, rows).all()
+                db.commit()
+                return created
+            except DBAPIError:
+                db.rollback()
+
+            # Something in the batch was rejected: replay it one post per
+            # savepoint so each failure is charged to its own post
+            results = []
+            for row in rows:
+                try:
+                    with db.begin_nested():
+                        results.append(db.execute(statement, [row]).one())
+                except DBAPIError as error:
+                    results.append(error)
+            db.commit()
+            return results
+
+
+# Registered ahead of main.py's routes when group commit is enabled
+router = APIRouter()
+
+@router.post("/posts", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
+async def create_post(post: PostCreate, request: Request):
+    values = post.model_dump()
+    try:
+        row = await request.app.state.post_writer.submit(values)
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Post already exists")
+    # The commit ran in the writer's thread, outside this request's context
+    record_write()
+    return {**values, "id": row.id, "created_at": row.created_at}
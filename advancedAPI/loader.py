@@ -0,0 +1,114 @@
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Request, Response, Header, status
+from sqlalchemy import select
+from models import Post
+from schema import PostResponse
+from pagination import MAX_PAGE_SIZE
+from serialization import POST_COLUMNS, PostPageResponse, post_rows, sparse_page_adapter
+from etag import list_etag, etag_matches
+from responses import cached_post, render_post
+
+
+class PostLoader:
+    """Dataloader for posts by id.
+
+    Lookups that arrive within `window` seconds of each other are answered by
+    one `SELECT ... WHERE id IN (...)`, and every caller asking for the same id
+    in that window shares one future (singleflight). A batch is sent early once
+    it holds `max_batch` ids. Ids only join a batch that hasn't been sent yet,
+    so a lookup never gets a row read before its request arrived.
+    """
+
+    def __init__(self, session_factory, window: float = 0.001, max_batch: int = 500):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}  # post id -> future, for the batch being collected
+        self._timer = None
+        self._fetches = set()  # running batch queries, kept referenced until done
+
+    async def load(self, post_id: int):
+        """The post's POST_COLUMNS row, or None if it doesn't exist."""
+        # Shielded: a caller that goes away mustn't cancel the future others share
+        return await asyncio.shield(self._future(post_id))
+
+    async def load_many(self, post_ids: List[int]) -> list:
+        """Rows for `post_ids`, in the same order; None for missing posts."""
+        futures = [self._future(post_id) for post_id in post_ids]
+        return await asyncio.shield(asyncio.gather(*futures))
+
+    def _future(self, post_id: int) -> asyncio.Future:
+        future = self._pending.get(post_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[post_id] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch)
+        return future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        fetch = asyncio.ensure_future(self._fetch(batch))
+        self._fetches.add(fetch)
+        fetch.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, batch: dict):
+        try:
+            # The session is synchronous; keep it off the event loop
+            rows = await asyncio.get_running_loop().run_in_executor(None, self._query, list(batch))
+        except Exception as error:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for post_id, future in batch.items():
+            if not future.done():
+                future.set_result(rows.get(post_id))
+
+    def _query(self, post_ids: list) -> dict:
+        with self.session_factory() as db:
+            return {row.id: row for row in db.execute(select(*POST_COLUMNS).where(Post.id.in_(post_ids)))}
+
+
+# ?ids=1,2,3 on GET /posts
+def parse_ids(ids: str) -> List[int]:
+    try:
+        post_ids = [int(post_id) for post_id in ids.split(",") if post_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="ids must be a comma-separated list of post ids")
+    post_ids = list(dict.fromkeys(post_ids))  # repeated ids are returned once
+    if not post_ids or len(post_ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"ids must list between 1 and {MAX_PAGE_SIZE} post ids")
+    return post_ids
+
+# Posts come back in the order asked for; ids that don't exist are left out.
+# Always a single page, so next_cursor is null.
+def posts_by_ids_response(rows: list, names: Optional[tuple], if_none_match: Optional[str]) -> Response:
+    posts = [row for row in rows if row is not None]
+    etag = list_etag(posts, extra="ids" + ("|" + ",".join(names) if names else ""))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    page = {"items": post_rows(posts), "next_cursor": None}
+    if names is not None:
+        return PostPageResponse(page, adapter=sparse_page_adapter(names), headers={"ETag": etag})
+    return PostPageResponse(page, headers={"ETag": etag})
+
+
+# GET /posts/{post_id} through the loader; registered ahead of main.py's routes
+# when `coalescing: {enabled: true}` is set
+router = APIRouter()
+
+@router.get("/posts/{post_id:int}", response_model=PostResponse, status_code=status.HTTP_200_OK)
+async def get_post_by_id(post_id: int, request: Request, if_none_match: Optional[str] = Header(None)):
+    response, token = cached_post(post_id, if_none_match)
+    if response is not None:
+        return response
+    return render_post(await request.app.state.post_loader.load(post_id), token, if_none_match)
@@ -1,86 +1,306 @@
-from fastapi import FastAPI, HTTPException, Depends, Response, status
+from contextlib import asynccontextmanager
+import anyio
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, status, Query, Header
+from fastapi.responses import StreamingResponse
 from models import Post 
 from sqlalchemy.orm import Session
-from database import SessionLocal, Base, engine, get_db
-Base.metadata.create_all(bind=engine)
-from schema import PostCreate, PostResponse, PostUpdate
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from database import SessionLocal, get_db, get_read_db
+from shared.engine import create_engine_from_config, pool_metrics
+from shared.metrics import install_metrics, instrument_engine
+from shared.profiling import install_profiling, attach_profiler
+from shared.settings import get_settings
+from shared.replicas import create_replica_set, track_writes, install_read_your_writes
+from schema import (PostCreate, PostResponse, PostUpdate, PostPatch, PostPage, BulkPostResult,
+                    PostChangesPage)
+from typing import List, Optional, Literal
+from pagination import MAX_PAGE_SIZE
+from export import iter_ndjson, iter_csv
+from cache import post_cache, configure_cache
+from changes import post_changed
+from search import search_posts as run_search
+from loader import PostLoader, parse_ids, posts_by_ids_response
+from change_feed import MAX_CHANGES_BATCH, changes_page
+import serialization
+from serialization import PostPageResponse, post_dicts, configure_serialization
+from shared.fields import parse_fields
+from etag import post_etag
+from responses import cached_post, render_post, page_columns, page_query, render_post_page
+from mutations import (create_post_statement, update_post_statement, delete_post_statement,
+                       post_exists_statement, mutation_error)
 from sqlalchemy import select
-        
-app = FastAPI()
 
-@app.post("/posts", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
+# The /posts routes; create_app() mounts them on an app
+router = APIRouter()
+
+@router.post("/posts", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
 def create_post(post: PostCreate, db: Session = Depends(get_db)):
-    db_post = db.query(Post).filter(Post.title == post.title).first()
-    if db_post:
+    # The unique index on title rejects duplicates, even between concurrent requests.
+    # INSERT ... RETURNING hands back id and created_at, so there's no refresh.
+    try:
+        new_post = db.execute(create_post_statement(post.model_dump())).one()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, 
                             detail="Post already exists")
-    else:
-        new_post = Post(**post.model_dump())
-        db.add(new_post)
+    post_changed(new_post.id)
+    return new_post._asdict()
+
+# Largest batch accepted by /posts/bulk
+MAX_BULK_POSTS = 10_000
+
+# One batched INSERT ... ON CONFLICT (title) DO NOTHING RETURNING for the whole
+# list, instead of insert + refresh per post. Titles that come back were created;
+# the rest already existed.
+@router.post("/posts/bulk", response_model=List[BulkPostResult], status_code=status.HTTP_200_OK)
+def create_posts_bulk(posts: List[PostCreate], db: Session = Depends(get_db)):
+    if len(posts) > MAX_BULK_POSTS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"At most {MAX_BULK_POSTS} posts per request")
+
+    results = [BulkPostResult(index=index, title=post.title, status="duplicate")
+               for index, post in enumerate(posts)]
+    first_seen = {}  # title -> index of its first occurrence; later copies are duplicates
+    for index, post in enumerate(posts):
+        first_seen.setdefault(post.title, index)
+
+    if first_seen:
+        rows = db.execute(
+            pg_insert(Post).on_conflict_do_nothing(index_elements=[Post.title])
+                           .returning(Post.id, Post.title),
+            [posts[index].model_dump() for index in first_seen.values()],
+        ).all()
         db.commit()
-        db.refresh(new_post)
-        return new_post
+        for post_id, title in rows:
+            result = results[first_seen[title]]
+            result.status = "created"
+            result.id = post_id
+            post_changed(post_id)
+    return results
 
-@app.get("/posts", response_model=List[PostResponse], status_code=status.HTTP_200_OK)
-def get_post(db: Session = Depends(get_db)):
-    posts = db.query(Post).all()
-    if posts is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Posts not found")
-    return posts 
+@router.get("/posts", response_model=PostPage, status_code=status.HTTP_200_OK)
+def get_post(request: Request, response: Response, db: Session = Depends(get_read_db),
+             limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+             cursor: Optional[str] = None,
+             if_none_match: Optional[str] = Header(None),
+             fields: Optional[str] = None,
+             ids: Optional[str] = None):
+    # ?fields=id,title selects and returns only those columns; the default is unchanged
+    names = parse_fields(fields, PostResponse.model_fields)
+    # ?ids=1,2,3 fetches those posts through the loader, batched with any
+    # concurrent lookups (see loader.py), instead of a page
+    if ids is not None:
+        rows = anyio.from_thread.run(request.app.state.post_loader.load_many, parse_ids(ids))
+        return posts_by_ids_response(rows, names, if_none_match)
+    columns = page_columns(names)
+    query = page_query(cursor, limit, columns)
+    posts = (db.scalars(query) if columns is None else db.execute(query)).all()
+    return render_post_page(posts, limit, columns, names, if_none_match, response)
 
-@app.get("/posts/{post_id}", response_model=PostResponse, status_code=status.HTTP_200_OK)
-def get_post_by_id(post_id: int, db: Session = Depends(get_db)):
+# Streams every post from a server-side cursor, so memory stays flat regardless
+# of table size. Registered before /posts/{post_id} so "export" isn't read as an id.
+@router.get("/posts/export")
+def export_posts(format: Literal["ndjson", "csv"] = "ndjson"):
+    if format == "csv":
+        return StreamingResponse(iter_csv(SessionLocal), media_type="text/csv",
+                                 headers={"Content-Disposition": 'attachment; filename="posts.csv"'})
+    return StreamingResponse(iter_ndjson(SessionLocal), media_type="application/x-ndjson")
+
+# Ranked full-text search: tsvector + GIN index on Postgres, an in-memory
+# inverted index elsewhere (see search.py). Paginated like GET /posts.
+@router.get("/posts/search", response_model=PostPage, status_code=status.HTTP_200_OK)
+def search_posts(q: str = Query(..., min_length=1), db: Session = Depends(get_read_db),
+                 limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                 cursor: Optional[str] = None):
+    page = run_search(db, q, cursor, limit)
+    if serialization.FAST_SERIALIZATION:
+        return PostPageResponse({"items": post_dicts(page["items"]), "next_cursor": page["next_cursor"]})
+    return page
+
+# What changed since a cursor, oldest first, for incremental sync instead of
+# re-reading every post: creates, updates and deletes (tombstones, post=null),
+# in batches of at most `limit`. Pass next_cursor back as ?since=; without it
+# the feed starts from the beginning of the log. See change_feed.py.
+@router.get("/posts/changes", response_model=PostChangesPage, status_code=status.HTTP_200_OK)
+def get_post_changes(since: Optional[str] = None, db: Session = Depends(get_read_db),
+                     limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_CHANGES_BATCH)):
+    return changes_page(db, since, limit)
+
+@router.get("/posts/{post_id}", response_model=PostResponse, status_code=status.HTTP_200_OK)
+def get_post_by_id(post_id: int, request: Request, db: Session = Depends(get_read_db),
+                   if_none_match: Optional[str] = Header(None)):
+    response, token = cached_post(post_id, if_none_match)
+    if response is not None:
+        return response
     # post = db.query(Post).filter(Post.id == post_id).first()
-    post = db.execute(select(Post).where(Post.id == post_id)).first()
-    if post is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    return post[0]
+    post = db.scalar(select(Post).where(Post.id == post_id))
+    # A lagging replica could put back a version post_changed() just dropped,
+    # so only rows read from the primary are cached
+    return render_post(post, token, if_none_match, cache=db.get_bind() is request.app.state.engine)
 
 
-@app.get("/posts/{post_id}", response_model=PostResponse, status_code=status.HTTP_200_OK)
+@router.get("/posts/{post_id}", response_model=PostResponse, status_code=status.HTTP_200_OK)
 def get_post_by_id(post_id: int, db: Session = Depends(get_db)):
     post = db.query(Post).filter(Post.id == post_id).first()
     if post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
     return post
 
-@app.put("/posts/{id}", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
-def update_post(id: int, updated_post: PostUpdate, db: Session= Depends(get_db)):
-    post = db.query(Post).filter(Post.id == id).first()
-    if post is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    else:
-        post.title = updated_post.title
-        post.content = updated_post.content
-        post.published = updated_post.published
-        db.commit()
-        db.refresh(post)
-        return post
-    
-@app.put("/posts_/{id}", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
-def update_post(id: int, updated_post: PostUpdate, db: Session= Depends(get_db)):
-    post_query = db.query(Post).filter(Post.id == id)
-    post = post_query.first()
-    
+# One UPDATE ... RETURNING: 404/412 come from an empty result rather than a
+# SELECT beforehand (see mutations.py)
+def apply_post_update(db: Session, id: int, changes: dict, if_match: Optional[str],
+                      response: Response) -> dict:
+    try:
+        post = db.execute(update_post_statement(id, changes, if_match)).first()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Post already exists")
     if post is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    else:
-        post_query.update(updated_post.model_dump(exclude_unset=True))
-        db.commit()
-        return post_query.first()
+        db.rollback()
+        raise mutation_error(if_match is not None and db.scalar(post_exists_statement(id)) is not None)
+    db.commit()
+    post_changed(id)
+    response.headers["ETag"] = post_etag(post.id, post.version)
+    return post._asdict()
+
+@router.put("/posts/{id}", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
+def update_post(id: int, updated_post: PostUpdate, response: Response, db: Session= Depends(get_db),
+                if_match: Optional[str] = Header(None)):
+    return apply_post_update(db, id, updated_post.model_dump(), if_match, response)
+
+# Only sets the columns present in the body
+@router.patch("/posts/{id}", response_model=PostResponse, status_code=status.HTTP_200_OK)
+def patch_post(id: int, patch: PostPatch, response: Response, db: Session = Depends(get_db),
+               if_match: Optional[str] = Header(None)):
+    changes = patch.model_dump(exclude_unset=True, exclude_none=True)
+    if not changes:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields to update")
+    return apply_post_update(db, id, changes, if_match, response)
     
+@router.put("/posts_/{id}", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
+def update_post(id: int, updated_post: PostUpdate, response: Response, db: Session= Depends(get_db),
+                if_match: Optional[str] = Header(None)):
+    return apply_post_update(db, id, updated_post.model_dump(exclude_unset=True), if_match, response)
     
-@app.delete("/posts/{id}", response_model=PostResponse, status_code=status.HTTP_200_OK)
-def delete_post(id: int, db: Session = Depends(get_db)):
-    post_query = db.query(Post).filter(Post.id == id)
-    post = post_query.first()
-    if post is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    else:
-        post_query.delete(synchronize_session=False)
-        db.commit()
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
     
+@router.delete("/posts/{id}", response_model=PostResponse, status_code=status.HTTP_200_OK)
+def delete_post(id: int, db: Session = Depends(get_db),
+                if_match: Optional[str] = Header(None)):
+    deleted = db.execute(delete_post_statement(id, if_match)).first()
+    if deleted is None:
+        db.rollback()
+        raise mutation_error(if_match is not None and db.scalar(post_exists_statement(id)) is not None)
+    db.commit()
+    post_changed(id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.get("/cache/stats", status_code=status.HTTP_200_OK)
+def cache_stats():
+    return post_cache.stats()
+
+# Connection pool occupancy and checkout wait times (see shared/engine.py)
+@router.get("/db/pool", status_code=status.HTTP_200_OK)
+def db_pool_stats(request: Request):
+    stats = {"sync": pool_metrics(request.app.state.engine)}
+    if request.app.state.async_engine is not None:
+        stats["async"] = pool_metrics(request.app.state.async_engine)
+    if request.app.state.replicas.replicas:
+        stats["replicas"] = request.app.state.replicas.status()
+    return stats
+
+
+# Nothing above touches config.yaml or the database. Settings are read here
+# (or passed in), and engines are created when a worker starts serving and
+# disposed when it stops. Tables are created by create_table.py, not on boot.
+#
+#   uvicorn main:create_app --factory
+def create_app(settings: Optional[dict] = None) -> FastAPI:
+    settings = get_settings() if settings is None else settings
+    db_config = settings["database"]
+    # Set `async: true` under `database` in config.yaml to serve /posts with the
+    # asyncpg-backed handlers in async_posts.py instead of the sync ones below
+    async_mode = db_config.get("async", False)
+    configure_cache(settings.get("cache", {}))
+    configure_serialization(settings.get("serialization", {}))
+    group_commit_config = settings.get("group_commit", {})
+    coalescing_config = settings.get("coalescing", {})
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        engine = create_engine_from_config(db_config)
+        instrument_engine(engine)
+        attach_profiler(engine)
+        SessionLocal.configure(bind=engine)
+        app.state.engine = engine
+        # GET handlers read from database.replicas when configured (shared/replicas.py)
+        app.state.replicas = create_replica_set(db_config, engine)
+        for replica in app.state.replicas.replicas:
+            instrument_engine(replica)
+            attach_profiler(replica)
+        track_writes(engine)
+        app.state.async_engine = None
+        if async_mode:
+            from shared.engine import create_async_engine_from_config
+            from async_database import AsyncSessionLocal
+            # Same database, reached through the asyncpg driver
+            app.state.async_engine = create_async_engine_from_config(db_config)
+            instrument_engine(app.state.async_engine)
+            attach_profiler(app.state.async_engine)
+            AsyncSessionLocal.configure(bind=app.state.async_engine)
+        app.state.post_loader = PostLoader(
+            SessionLocal,
+            window=coalescing_config.get("window_ms", 1) / 1000,
+            max_batch=coalescing_config.get("max_batch", 500),
+        )
+        if group_commit_config.get("enabled", False):
+            from group_commit import GroupCommitter
+            app.state.post_writer = GroupCommitter(
+                SessionLocal,
+                max_batch=group_commit_config.get("max_batch", 100),
+                max_delay=group_commit_config.get("max_delay_ms", 5) / 1000,
+                max_pending=group_commit_config.get("max_pending", 1000),
+            )
+            app.state.post_writer.start()
+        try:
+            yield
+        finally:
+            if group_commit_config.get("enabled", False):
+                await app.state.post_writer.stop()
+            if app.state.async_engine is not None:
+                await app.state.async_engine.dispose()
+            app.state.replicas.dispose()
+            engine.dispose()
+
+    app = FastAPI(lifespan=lifespan)
+    install_metrics(app)
+    install_read_your_writes(app, db_config)
+    install_profiling(app, settings.get("profiling", {}))
+    if group_commit_config.get("enabled", False):
+        from group_commit import router as group_commit_router
+        # POST /posts goes through the batching writer; registered first so it
+        # takes precedence over both the sync and the async create handler
+        app.include_router(group_commit_router, include_in_schema=False)
+    if coalescing_config.get("enabled", False):
+        from loader import router as loader_router
+        # GET /posts/{id} is answered through app.state.post_loader, ahead of
+        # both the sync and the async handler
+        app.include_router(loader_router, include_in_schema=False)
+    if async_mode:
+        from async_posts import router as async_posts_router
+        # Registered before the sync handlers so matching routes resolve to the
+        # async versions; the schema is identical, so keep the docs from listing both
+        app.include_router(async_posts_router, include_in_schema=False)
+    app.include_router(router)
+    return app
 
 
+# `uvicorn main:app` keeps working: the app is built on first access to
+# main.app rather than when the module is imported
+def __getattr__(name):
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
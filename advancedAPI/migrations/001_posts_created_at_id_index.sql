@@ -0,0 +1,5 @@
+-- Composite index for keyset pagination on GET /posts (see pagination.py).
+-- Base.metadata.create_all only creates missing tables, so existing
+-- databases need this applied by hand.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_created_at_id
+    ON posts (created_at, id);
@@ -0,0 +1,4 @@
+-- Row version and last-modified time for ETags / If-Match (see etag.py)
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+UPDATE posts SET updated_at = created_at WHERE updated_at IS NULL;
@@ -0,0 +1,5 @@
+-- Enforce unique post titles in the database instead of a SELECT before
+-- every insert. Remove any existing duplicate titles before running this.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_title_unique ON posts (title);
+DROP INDEX IF EXISTS ix_posts_title;
+ALTER INDEX ix_posts_title_unique RENAME TO ix_posts_title;
@@ -0,0 +1,7 @@
+-- Full-text search for GET /posts/search (see search.py). Titles rank above content.
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector);
@@ -0,0 +1,24 @@
+-- Change log for GET /posts/changes (see change_feed.py). Needs PostgreSQL 13+
+-- for pg_current_xact_id(). Rows are written by a trigger in the same
+-- transaction as the change, including tombstones for deleted posts.
+CREATE TABLE IF NOT EXISTS post_changes (
+    seq BIGSERIAL PRIMARY KEY,
+    post_id INTEGER NOT NULL,
+    op VARCHAR(6) NOT NULL,
+    txid BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_post_changes_txid_seq ON post_changes (txid, seq);
+
+CREATE OR REPLACE FUNCTION record_post_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO post_changes (post_id, op, txid)
+    VALUES (CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END,
+            lower(TG_OP), pg_current_xact_id()::text::bigint);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS posts_record_change ON posts;
+CREATE TRIGGER posts_record_change AFTER INSERT OR UPDATE OR DELETE ON posts
+    FOR EACH ROW EXECUTE FUNCTION record_post_change();
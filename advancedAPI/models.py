@@ -1,6 +1,6 @@
 from database import Base
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, DateTime, Boolean, Column
+from sqlalchemy import String, Integer, BigInteger, DateTime, Boolean, Column, Index, DDL, event
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 import datetime
 from sqlalchemy.sql.expression import text
@@ -9,7 +9,7 @@ class Post(Base):
     __tablename__ = "posts"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    title: Mapped[str] = mapped_column(String, index=True, nullable=False)
+    title: Mapped[str] = mapped_column(String, index=True, unique=True, nullable=False)
     content: Mapped[str] = mapped_column(String, nullable=False)
     published: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime.datetime] = mapped_column(
@@ -18,6 +18,68 @@ class Post(Base):
     
     # created_at = Mapped[datetime.datetime] = mapped_column(TIMESTAMP, server_default=text('now()'))
 
+    # Bumped on every change; feeds the ETags in etag.py
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default=text("1"))
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc),
+        onupdate=lambda: datetime.datetime.now(datetime.timezone.utc)
+    )
+
+    # Backs the keyset pagination in pagination.py
+    __table_args__ = (Index("ix_posts_created_at_id", "created_at", "id"),)
+    # The ORM increments version on flush and checks it in the UPDATE's WHERE clause
+    __mapper_args__ = {"version_id_col": version}
+
+# The full-text column and GIN index from migrations/004, for databases made
+# by create_table.py (see search.py). Generated, so writers never set it; it
+# isn't mapped, so select(Post) doesn't fetch it, and other databases use the
+# in-memory index instead.
+event.listen(Post.__table__, "after_create", DDL("""
+ALTER TABLE posts ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED;
+CREATE INDEX ix_posts_search_vector ON posts USING GIN (search_vector);
+""").execute_if(dialect="postgresql"))
+
+# Change log behind GET /posts/changes (see change_feed.py): one row per insert,
+# update or delete of a post, written by triggers on posts. Deleted posts keep
+# their rows here as tombstones.
+class PostChange(Base):
+    __tablename__ = "post_changes"
+
+    seq: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    post_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(6), nullable=False)  # insert / update / delete
+    # Writing transaction's id on Postgres (0 elsewhere); the feed is ordered by (txid, seq)
+    txid: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default=text("0"))
+    changed_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, nullable=False, server_default=text("CURRENT_TIMESTAMP")
+    )
+
+    __table_args__ = (Index("ix_post_changes_txid_seq", "txid", "seq"),)
+
+# The same triggers as migrations/005, for databases made by create_table.py
+event.listen(PostChange.__table__, "after_create", DDL("""
+CREATE OR REPLACE FUNCTION record_post_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO post_changes (post_id, op, txid)
+    VALUES (CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END,
+            lower(TG_OP), pg_current_xact_id()::text::bigint);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER posts_record_change AFTER INSERT OR UPDATE OR DELETE ON posts
+    FOR EACH ROW EXECUTE FUNCTION record_post_change();
+""").execute_if(dialect="postgresql"))
+# SQLite has one writer at a time, so seq order is already commit order
+for _op, _row in (("insert", "NEW"), ("update", "NEW"), ("delete", "OLD")):
+    event.listen(PostChange.__table__, "after_create", DDL(f"""
+CREATE TRIGGER posts_record_{_op} AFTER {_op.upper()} ON posts
+BEGIN INSERT INTO post_changes (post_id, op) VALUES ({_row}.id, '{_op}'); END;
+""").execute_if(dialect="sqlite"))
+
 class User(Base):
     __tablename__ = "Users"
     
@@ -0,0 +1,45 @@
+import datetime
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import insert, update, delete, select
+from models import Post
+from serialization import POST_COLUMNS
+from etag import if_match_versions
+
+# Every post write is a single INSERT/UPDATE/DELETE ... RETURNING: the If-Match
+# check is part of the WHERE clause and the written row comes back from the same
+# round trip, so there is no SELECT before the write and no refresh after it.
+# Used by both main.py and async_posts.py.
+
+def create_post_statement(values: dict):
+    return insert(Post).values(**values).returning(*POST_COLUMNS)
+
+# These are bulk statements, which the ORM's version counter doesn't see, so
+# the version (and with it the ETag) is bumped here
+def update_post_statement(post_id: int, changes: dict, if_match: Optional[str]):
+    statement = update(Post).where(Post.id == post_id)
+    versions = if_match_versions(if_match, post_id)
+    if versions is not None:
+        statement = statement.where(Post.version.in_(versions))
+    return (statement.values(**changes, version=Post.version + 1,
+                             updated_at=datetime.datetime.now(datetime.timezone.utc))
+                     .returning(*POST_COLUMNS)
+                     .execution_options(synchronize_session=False))
+
+def delete_post_statement(post_id: int, if_match: Optional[str]):
+    statement = delete(Post).where(Post.id == post_id)
+    versions = if_match_versions(if_match, post_id)
+    if versions is not None:
+        statement = statement.where(Post.version.in_(versions))
+    return statement.returning(Post.id).execution_options(synchronize_session=False)
+
+# Nothing came back: the post doesn't exist, or If-Match named a stale version.
+# Only with an If-Match is a second query needed to tell the two apart.
+def post_exists_statement(post_id: int):
+    return select(Post.id).where(Post.id == post_id)
+
+def mutation_error(exists: bool) -> HTTPException:
+    if exists:
+        return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
+                             detail="Post was modified; fetch it again and retry")
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
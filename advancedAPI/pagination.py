@@ -0,0 +1,46 @@
+import base64
+import datetime
+import json
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy import select, tuple_
+from models import Post
+
+# Upper bound for ?limit= on paginated routes
+MAX_PAGE_SIZE = 100
+
+# Cursors are opaque to clients: base64 of the sort key of the last row served
+def encode_token(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_token(cursor: str, *types):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def encode_cursor(created_at: datetime.datetime, post_id: int) -> str:
+    return encode_token([created_at.isoformat(), post_id])
+
+def decode_cursor(cursor: str):
+    return decode_token(cursor, datetime.datetime.fromisoformat, int)
+
+# Newest first. Seeking past the cursor with a row comparison on the
+# (created_at, id) index costs the same for every page, unlike OFFSET.
+# Pass `columns` to select plain rows instead of Post objects.
+def posts_page_query(cursor: Optional[str], limit: int, columns=(Post,)):
+    query = select(*columns).order_by(Post.created_at.desc(), Post.id.desc())
+    if cursor is not None:
+        created_at, post_id = decode_cursor(cursor)
+        query = query.where(tuple_(Post.created_at, Post.id) < (created_at, post_id))
+    # Fetch one extra row to know whether another page exists
+    return query.limit(limit + 1)
+
+def next_cursor(rows: list, limit: int):
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last.created_at, last.id)
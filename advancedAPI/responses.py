@@ -0,0 +1,72 @@
+from typing import Optional, Tuple
+from fastapi import HTTPException, Response, status
+from schema import PostResponse
+from pagination import posts_page_query, next_cursor
+from cache import post_cache, post_cache_key, pack_post, unpack_post
+import serialization
+from serialization import POST_COLUMNS, PostPageResponse, post_rows, sparse_post_columns, sparse_page_adapter
+from etag import post_etag, list_etag, etag_matches
+
+# Rendering for the GET /posts routes: caching, ETags and 304s are decided
+# here, so the sync (main.py), async (async_posts.py) and coalescing
+# (loader.py) versions only differ in how they read the database.
+
+# GET /posts/{id}. A hit is served as the cached JSON, skipping the query and
+# PostResponse validation. On a miss, the caller reads the post and passes it
+# to render_post() with the token, taken before the read: if a writer drops
+# the key meanwhile, the fill is skipped (see cache.py).
+def cached_post(post_id: int, if_none_match: Optional[str]) -> Tuple[Optional[Response], Optional[int]]:
+    cached = post_cache.get(post_cache_key(post_id))
+    if cached is None:
+        return None, post_cache.fill_token(post_cache_key(post_id))
+    etag, body = unpack_post(cached)
+    return _post_response(etag, body, if_none_match), None
+
+# `post` is an ORM object or a POST_COLUMNS row, or None if it doesn't exist
+def render_post(post, token: int, if_none_match: Optional[str], cache: bool = True) -> Response:
+    if post is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+    etag = post_etag(post.id, post.version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    body = PostResponse.model_validate(post).model_dump_json().encode()
+    if cache:
+        post_cache.set(post_cache_key(post.id), pack_post(etag, body), token)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def _post_response(etag: str, body: bytes, if_none_match: Optional[str]) -> Response:
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+# GET /posts. ?fields= selects only those columns, the fast serialization path
+# selects POST_COLUMNS, and otherwise ORM objects are loaded (columns is None).
+def page_columns(names: Optional[tuple]) -> Optional[tuple]:
+    if names is not None:
+        return sparse_post_columns(names)
+    if serialization.FAST_SERIALIZATION:
+        return POST_COLUMNS
+    return None
+
+def page_query(cursor: Optional[str], limit: int, columns: Optional[tuple]):
+    if columns is None:
+        return posts_page_query(cursor, limit)
+    return posts_page_query(cursor, limit, columns=columns)
+
+# `posts` is the result of page_query(): up to limit + 1 rows
+def render_post_page(posts: list, limit: int, columns: Optional[tuple], names: Optional[tuple],
+                     if_none_match: Optional[str], response: Response):
+    page_cursor = next_cursor(posts, limit)
+    # The fieldset is part of the representation, so it is part of the ETag
+    etag = list_etag(posts[:limit], extra=(page_cursor or "") + ("|" + ",".join(names) if names else ""))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    if names is not None:
+        return PostPageResponse({"items": post_rows(posts[:limit], columns), "next_cursor": page_cursor},
+                                adapter=sparse_page_adapter(names), headers={"ETag": etag})
+    if columns is not None:
+        return PostPageResponse({"items": post_rows(posts[:limit]), "next_cursor": page_cursor},
+                                headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"items": posts[:limit], "next_cursor": page_cursor}
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 import datetime
+from typing import List, Optional, Literal
 
 class PostBase(BaseModel):
     title: str
@@ -18,3 +19,31 @@ class PostResponse(PostBase):
         
 class PostUpdate(PostBase):
     pass
+
+class PostPatch(BaseModel):
+    # PATCH /posts/{id}: only the fields present in the body are written;
+    # absent or null ones keep their current value
+    title: Optional[str] = None
+    content: Optional[str] = None
+    published: Optional[bool] = None
+
+class PostPage(BaseModel):
+    items: List[PostResponse]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to get the next page
+
+class BulkPostResult(BaseModel):
+    index: int  # position in the request body
+    title: str
+    status: Literal["created", "duplicate"]
+    id: Optional[int] = None
+
+class PostChangeResponse(BaseModel):
+    seq: int
+    post_id: int
+    op: Literal["insert", "update", "delete"]
+    post: Optional[PostResponse] = None  # current state; null once the post is deleted
+
+class PostChangesPage(BaseModel):
+    changes: List[PostChangeResponse]
+    next_cursor: Optional[str] = None  # pass back as ?since= to get later changes
+    has_more: bool
@@ -0,0 +1,123 @@
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import select, tuple_, func, cast, literal, literal_column, REAL
+from models import Post
+from pagination import encode_token, decode_token
+
+# Field weights for the in-memory index, mirroring setweight 'A' (title) / 'B'
+# (content) on the posts.search_vector column (models.py, migrations/004)
+TITLE_WEIGHT = 1.0
+CONTENT_WEIGHT = 0.4
+
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def postgres_search_query(q: str, after: Optional[Tuple[float, int]], limit: int):
+    """Ranked full-text query over the GIN-indexed search_vector column."""
+    vector = literal_column("posts.search_vector")
+    tsquery = func.websearch_to_tsquery("english", q)
+    rank = func.ts_rank_cd(vector, tsquery)
+    query = (select(Post, rank.label("rank"))
+             .where(vector.op("@@")(tsquery))
+             .order_by(rank.desc(), Post.id.desc()))
+    if after is not None:
+        # ts_rank_cd returns real; compare in real so the cursor value round-trips exactly
+        after_rank, after_id = after
+        query = query.where(tuple_(rank, Post.id) < tuple_(cast(literal(after_rank), REAL), after_id))
+    return query.limit(limit + 1)
+
+
+class InvertedIndex:
+    """In-memory term -> {post_id: weight} index for databases without
+    full-text search (SQLite in tests and local runs).
+
+    Built from the posts table on first use. Writers call mark_dirty(post_id)
+    after committing, and the next search re-reads just those rows.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._terms: Dict[int, Set[str]] = {}  # post_id -> terms, for removal
+        self._dirty: Set[int] = set()
+        self._built = False
+        self._lock = threading.Lock()
+
+    def mark_dirty(self, post_id: int):
+        with self._lock:
+            if self._built:
+                self._dirty.add(post_id)
+
+    def _remove(self, post_id: int):
+        for term in self._terms.pop(post_id, ()):
+            postings = self._postings[term]
+            postings.pop(post_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def _add(self, post_id: int, title: str, content: str):
+        weights: Dict[str, float] = defaultdict(float)
+        for term in tokenize(title):
+            weights[term] += TITLE_WEIGHT
+        for term in tokenize(content):
+            weights[term] += CONTENT_WEIGHT
+        for term, weight in weights.items():
+            self._postings[term][post_id] = weight
+        self._terms[post_id] = set(weights)
+
+    def _refresh(self, db):
+        if not self._built:
+            rows = db.execute(select(Post.id, Post.title, Post.content))
+            self._built = True
+        elif self._dirty:
+            ids, self._dirty = self._dirty, set()
+            for post_id in ids:
+                self._remove(post_id)
+            rows = db.execute(select(Post.id, Post.title, Post.content).where(Post.id.in_(ids)))
+        else:
+            return
+        for post_id, title, content in rows:
+            self._add(post_id, title, content)
+
+    def search(self, db, q: str, after: Optional[Tuple[float, int]], limit: int) -> List[Tuple[float, int]]:
+        """(score, post_id) pairs ranked like the Postgres query: every term
+        must match, best score first, ties broken by id descending."""
+        terms = set(tokenize(q))
+        if not terms:
+            return []
+        with self._lock:
+            self._refresh(db)
+            postings = sorted((self._postings.get(term, {}) for term in terms), key=len)
+            scores = {post_id: weight for post_id, weight in postings[0].items()}
+            for other in postings[1:]:
+                scores = {post_id: score + other[post_id]
+                          for post_id, score in scores.items() if post_id in other}
+        ranked = sorted(((score, post_id) for post_id, score in scores.items()), reverse=True)
+        if after is not None:
+            ranked = [hit for hit in ranked if hit < tuple(after)]
+        return ranked[:limit + 1]
+
+
+search_index = InvertedIndex()
+
+
+def search_posts(db, q: str, cursor: Optional[str], limit: int) -> dict:
+    """One page of posts matching q, best match first, as a PostPage dict."""
+    after = decode_token(cursor, float, int) if cursor is not None else None
+    if db.get_bind().dialect.name == "postgresql":
+        hits = [(rank, post) for post, rank in db.execute(postgres_search_query(q, after, limit))]
+    else:
+        ranked = search_index.search(db, q, after, limit)
+        posts = {post.id: post for post in db.scalars(
+            select(Post).where(Post.id.in_([post_id for _, post_id in ranked])))}
+        hits = [(score, posts[post_id]) for score, post_id in ranked if post_id in posts]
+
+    next_cursor = None
+    if len(hits) > limit:
+        rank, post = hits[limit - 1]
+        next_cursor = encode_token([rank, post.id])
+    return {"items": [post for _, post in hits[:limit]], "next_cursor": next_cursor}
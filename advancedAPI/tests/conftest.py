@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+import pytest
+
+# The app imports its modules flat (from models import Post) and shared helpers
+# from the repository root, as when it is run with PYTHONPATH=.. from advancedAPI
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(APP_DIR), str(APP_DIR.parent)]
+
+
+@pytest.fixture
+def settings(tmp_path):
+    # A throwaway SQLite file per test, passed straight to create_app()
+    return {"database": {"url": f"sqlite:///{tmp_path / 'posts.db'}",
+                         "pool": {"size": 20, "max_overflow": 0}}}
+
+
+@pytest.fixture
+def app(settings):
+    import main
+    from cache import post_cache
+    from search import search_index
+
+    # Module-level caches outlive an app; start every test empty
+    post_cache.__init__(post_cache.maxsize, post_cache.ttl)
+    search_index.__init__()
+    return main.create_app(settings)
+
+
+@pytest.fixture
+def client(app):
+    from fastapi.testclient import TestClient
+    from database import Base
+
+    with TestClient(app) as client:
+        Base.metadata.create_all(app.state.engine)
+        yield client
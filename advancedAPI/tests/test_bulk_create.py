@@ -0,0 +1,47 @@
+import main
+
+
+def bulk(client, titles):
+    return client.post("/posts/bulk", json=[{"title": title, "content": "x"} for title in titles])
+
+
+def test_status_per_post(client):
+    existing = client.post("/posts", json={"title": "old", "content": "x"}).json()["id"]
+    response = bulk(client, ["new 1", "old", "new 2"])
+    assert response.status_code == 200
+    results = response.json()
+    assert [(result["index"], result["title"], result["status"]) for result in results] == [
+        (0, "new 1", "created"), (1, "old", "duplicate"), (2, "new 2", "created")]
+    assert results[1]["id"] is None
+    # The returned ids are the stored posts
+    for result in (results[0], results[2]):
+        assert client.get(f"/posts/{result['id']}").json()["title"] == result["title"]
+    assert existing not in {result["id"] for result in results}
+
+
+def test_repeats_within_a_request_are_duplicates(client):
+    results = bulk(client, ["a", "b", "a", "a", "b"]).json()
+    assert [result["status"] for result in results] == ["created", "created", "duplicate", "duplicate", "duplicate"]
+    assert len(client.get("/posts").json()["items"]) == 2
+
+
+def test_new_posts_are_searchable(client):
+    client.get("/posts/search", params={"q": "python"})  # builds the in-memory index
+    bulk(client, ["python tips"])
+    assert [post["title"] for post in client.get("/posts/search", params={"q": "python"}).json()["items"]] == [
+        "python tips"]
+
+
+def test_size_limit(client, monkeypatch):
+    monkeypatch.setattr(main, "MAX_BULK_POSTS", 3)
+    response = bulk(client, ["a", "b", "c", "d"])
+    assert response.status_code == 413
+    assert response.json()["detail"] == "At most 3 posts per request"
+    assert client.get("/posts").json()["items"] == []
+    assert [result["status"] for result in bulk(client, ["a", "b", "c"]).json()] == ["created"] * 3
+
+
+def test_empty_request(client):
+    response = bulk(client, [])
+    assert response.status_code == 200
+    assert response.json() == []
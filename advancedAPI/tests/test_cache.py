@@ -0,0 +1,52 @@
+from sqlalchemy import insert, update
+import responses
+from cache import LRUCache, post_cache, post_cache_key
+from changes import post_changed
+from etag import post_etag
+from models import Post
+
+
+def test_fill_is_skipped_after_delete():
+    cache = LRUCache()
+    token = cache.fill_token("post:1")
+    cache.delete("post:1")
+    cache.set("post:1", b"stale", token)
+    assert cache.get("post:1") is None
+    # A read that starts after the delete fills as usual
+    cache.set("post:1", b"fresh", cache.fill_token("post:1"))
+    assert cache.get("post:1") == b"fresh"
+
+
+def test_fill_is_skipped_once_the_tombstone_is_evicted():
+    cache = LRUCache(maxsize=2)
+    token = cache.fill_token("post:1")
+    cache.delete("post:1")
+    cache.set("post:2", b"two")
+    cache.set("post:3", b"three")  # evicts the post:1 tombstone
+    cache.set("post:1", b"stale", token)
+    assert cache.get("post:1") is None
+
+
+def test_get_racing_a_put_does_not_cache_the_old_version(client, app, monkeypatch):
+    with app.state.engine.begin() as conn:
+        post_id = conn.execute(insert(Post).values(title="v1", content="x").returning(Post.id)).scalar()
+
+    # A PUT commits and drops the cache entry after the GET has read version 1
+    # but before it fills the cache
+    def etag_then_write(id, version):
+        with app.state.engine.begin() as conn:
+            conn.execute(update(Post).where(Post.id == id).values(title="v2", version=Post.version + 1))
+        post_changed(id)
+        return post_etag(id, version)
+
+    monkeypatch.setattr(responses, "post_etag", etag_then_write)
+    assert client.get(f"/posts/{post_id}").headers["ETag"] == f'"{post_id}-1"'
+    monkeypatch.setattr(responses, "post_etag", post_etag)
+
+    assert post_cache.get(post_cache_key(post_id)) is None
+    response = client.get(f"/posts/{post_id}")
+    assert response.headers["ETag"] == f'"{post_id}-2"'
+    assert response.json()["title"] == "v2"
+    response = client.put(f"/posts/{post_id}", json={"title": "v3", "content": "x"},
+                          headers={"If-Match": f'"{post_id}-2"'})
+    assert response.status_code == 201
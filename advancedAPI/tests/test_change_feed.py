@@ -0,0 +1,51 @@
+import threading
+from sqlalchemy import select
+from models import PostChange
+
+WRITERS = 8
+POSTS_PER_WRITER = 25
+
+
+def write_posts(client, writer):
+    for i in range(POSTS_PER_WRITER):
+        post_id = client.post("/posts", json={"title": f"w{writer}-{i}", "content": "x"}).json()["id"]
+        assert client.put(f"/posts/{post_id}", json={"title": f"w{writer}-{i}", "content": "y"}).status_code == 201
+        if i % 3 == 0:
+            assert client.delete(f"/posts/{post_id}").status_code == 204
+
+
+def test_follower_sees_every_change_under_concurrent_writes(client, app):
+    seen = []
+    writing = threading.Event()
+    writing.set()
+
+    # Pages through the feed until the writers are done and it has caught up
+    def follow():
+        cursor = None
+        while True:
+            done = not writing.is_set()
+            params = {"limit": 50} if cursor is None else {"since": cursor, "limit": 50}
+            response = client.get("/posts/changes", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            seen.extend((change["seq"], change["op"], change["post_id"]) for change in page["changes"])
+            cursor = page["next_cursor"]
+            if done and not page["has_more"]:
+                return
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    writers = [threading.Thread(target=write_posts, args=(client, writer)) for writer in range(WRITERS)]
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    writing.clear()
+    follower.join()
+
+    with app.state.engine.connect() as conn:
+        logged = conn.execute(select(PostChange.seq, PostChange.op, PostChange.post_id)
+                              .order_by(PostChange.txid, PostChange.seq)).all()
+    deletes = WRITERS * len(range(0, POSTS_PER_WRITER, 3))
+    assert len(logged) == WRITERS * POSTS_PER_WRITER * 2 + deletes
+    assert seen == [tuple(row) for row in logged]
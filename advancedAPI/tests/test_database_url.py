@@ -0,0 +1,20 @@
+from shared.engine import database_url
+
+
+def test_url_gets_the_async_driver():
+    config = {"url": "postgresql://user:p%40ss@db:5432/posts"}
+    assert database_url(config) == "postgresql://user:p%40ss@db:5432/posts"
+    assert database_url(config, "postgresql+asyncpg") == "postgresql+asyncpg://user:p%40ss@db:5432/posts"
+    config = {"url": "postgresql+psycopg2://user@db/posts"}
+    assert database_url(config, "postgresql+asyncpg") == "postgresql+asyncpg://user@db/posts"
+
+
+def test_url_for_another_database_is_kept():
+    config = {"url": "sqlite:///posts.db"}
+    assert database_url(config) == "sqlite:///posts.db"
+    assert database_url(config, "postgresql+asyncpg") == "sqlite:///posts.db"
+
+
+def test_connection_fields():
+    config = {"user": "u", "password": "p", "host": "db", "port": 5432, "name": "posts"}
+    assert database_url(config, "postgresql+asyncpg") == "postgresql+asyncpg://u:p@db:5432/posts"
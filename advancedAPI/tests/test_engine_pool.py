@@ -0,0 +1,74 @@
+import threading
+import time
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from shared.engine import create_engine_from_config, pool_metrics
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    engines = []
+
+    def make(**pool):
+        config = {"url": f"sqlite:///{tmp_path / 'pool.db'}",
+                  "pool": {"size": 1, "max_overflow": 0, "pre_ping": False, **pool}}
+        engines.append(create_engine_from_config(config))
+        return engines[-1]
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+def test_saturated_pool_records_the_wait(make_engine):
+    engine = make_engine(timeout=5)
+    checked_out = threading.Event()
+
+    def hold():
+        with engine.connect():
+            checked_out.set()
+            time.sleep(0.2)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    checked_out.wait(5)
+    with engine.connect() as conn:  # waits for the holder to give the only connection back
+        conn.execute(text("select 1"))
+    holder.join()
+
+    metrics = pool_metrics(engine)
+    assert metrics["wait_count"] == 2
+    assert 0.1 < metrics["wait_seconds_total"] < 1
+    assert metrics["wait_histogram"]["0.001"] == 1  # the first checkout found the pool free
+    assert metrics["wait_histogram"]["0.5"] == 2
+
+
+def test_timeouts_are_counted(make_engine):
+    engine = make_engine(timeout=0.05)
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    metrics = pool_metrics(engine)
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_seconds_total"] >= 0.05
+
+
+def test_opening_a_connection_is_not_a_wait(make_engine):
+    engine = make_engine(size=2)
+    event.listen(engine, "connect", lambda *args: time.sleep(0.2))
+    with engine.connect(), engine.connect():
+        pass
+    # Both checkouts opened a new connection slowly, but neither waited for one
+    assert pool_metrics(engine)["wait_seconds_total"] < 0.1
+
+
+def test_postgres_settings_are_ignored_elsewhere(tmp_path):
+    config = {"url": f"sqlite:///{tmp_path / 'pool.db'}", "statement_timeout": 5000,
+              "application_name": "posts-api"}
+    engine = create_engine_from_config(config)
+    try:
+        with engine.connect() as conn:
+            assert conn.scalar(text("select 1")) == 1
+    finally:
+        engine.dispose()
@@ -0,0 +1,65 @@
+import pytest
+
+
+def create_post(client, title="first"):
+    response = client.post("/posts", json={"title": title, "content": "x"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_post_not_modified(client):
+    post_id = create_post(client)
+    # Once from the database, then from the cache
+    for _ in range(2):
+        etag = client.get(f"/posts/{post_id}").headers["ETag"]
+        response = client.get(f"/posts/{post_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+
+def test_post_page_not_modified(client):
+    create_post(client, "first")
+    create_post(client, "second")
+    etag = client.get("/posts").headers["ETag"]
+    response = client.get("/posts", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # A changed post changes the page's ETag
+    client.post("/posts", json={"title": "third", "content": "x"})
+    response = client.get("/posts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 3
+
+
+@pytest.mark.parametrize("method", ["put", "delete"])
+def test_stale_if_match_is_rejected(client, method):
+    post_id = create_post(client)
+    stale = client.get(f"/posts/{post_id}").headers["ETag"]
+    response = client.put(f"/posts/{post_id}", json={"title": "edited", "content": "x"},
+                          headers={"If-Match": stale})
+    assert response.status_code == 201
+    current = response.headers["ETag"]
+    assert current != stale
+
+    kwargs = {"json": {"title": "again", "content": "x"}} if method == "put" else {}
+    response = client.request(method.upper(), f"/posts/{post_id}", headers={"If-Match": stale}, **kwargs)
+    assert response.status_code == 412
+    # The post is untouched, and the current ETag still works
+    assert client.get(f"/posts/{post_id}").json()["title"] == "edited"
+    response = client.request(method.upper(), f"/posts/{post_id}", headers={"If-Match": current}, **kwargs)
+    assert response.status_code == (201 if method == "put" else 204)
+
+
+def test_weak_if_match_is_rejected(client):
+    post_id = create_post(client)
+    etag = client.get(f"/posts/{post_id}").headers["ETag"]
+    # Weak tags only match for If-None-Match
+    assert client.get(f"/posts/{post_id}", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    response = client.put(f"/posts/{post_id}", json={"title": "edited", "content": "x"},
+                          headers={"If-Match": f"W/{etag}"})
+    assert response.status_code == 412
+    response = client.put(f"/posts/{post_id}", json={"title": "edited", "content": "x"},
+                          headers={"If-Match": f"W/{etag}, {etag}"})
+    assert response.status_code == 201
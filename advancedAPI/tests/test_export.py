@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+import tracemalloc
+from sqlalchemy import insert
+from database import SessionLocal
+from export import EXPORT_COLUMNS, iter_ndjson, iter_csv
+from models import Post
+
+
+def add_posts(engine, start, count):
+    with engine.begin() as conn:
+        conn.execute(insert(Post), [{"title": f"post {i}", "content": "x" * 200}
+                                    for i in range(start, start + count)])
+
+
+def test_ndjson_export_has_every_post(client, app):
+    add_posts(app.state.engine, 0, 3)
+    response = client.get("/posts/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["post 0", "post 1", "post 2"]
+    assert list(rows[0]) == EXPORT_COLUMNS
+
+
+def test_csv_export_has_every_post(client, app):
+    add_posts(app.state.engine, 0, 3)
+    response = client.get("/posts/export", params={"format": "csv"})
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == EXPORT_COLUMNS
+    assert [row[1] for row in rows[1:]] == ["post 0", "post 1", "post 2"]
+
+
+def peak_while_exporting(iterate) -> int:
+    tracemalloc.start()
+    try:
+        for _ in iterate(SessionLocal):
+            pass  # the body is sent and dropped chunk by chunk
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_export_memory_does_not_grow_with_row_count(client, app):
+    add_posts(app.state.engine, 0, 5_000)
+    # Warm up statement caches so they aren't counted against the first run
+    peak_while_exporting(iter_ndjson)
+    small = {iterate: peak_while_exporting(iterate) for iterate in (iter_ndjson, iter_csv)}
+
+    add_posts(app.state.engine, 5_000, 45_000)  # 10x the rows
+    for iterate, peak in small.items():
+        # Holding the rows would need ~10x the memory; streaming stays flat
+        assert peak_while_exporting(iterate) < 2 * peak
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+import group_commit
+from database import Base
+from models import Post
+
+
+def test_abandoned_create_is_still_invalidated(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'posts.db'}")
+    Base.metadata.create_all(engine)
+    changed = []
+    monkeypatch.setattr(group_commit, "post_changed", changed.append)
+
+    async def scenario():
+        writer = group_commit.GroupCommitter(sessionmaker(bind=engine), max_delay=0.05)
+        writer.start()
+        kept = asyncio.create_task(writer.submit({"title": "kept", "content": "x", "published": True}))
+        gone = asyncio.create_task(writer.submit({"title": "gone", "content": "x", "published": True}))
+        await asyncio.sleep(0)  # both are queued
+        gone.cancel()  # the client disconnected while its post waited for the batch
+        row = await kept
+        await writer.stop()
+        return row
+
+    row = asyncio.run(scenario())
+    with engine.connect() as conn:
+        ids = conn.scalars(select(Post.id).order_by(Post.id)).all()
+    assert len(ids) == 2 and row.id in ids
+    assert sorted(changed) == ids
+
+
+def post(title):
+    return {"title": title, "content": "x", "published": True}
+
+
+def test_writer_survives_a_failed_batch(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'posts.db'}")
+    Base.metadata.create_all(engine)
+
+    async def scenario():
+        writer = group_commit.GroupCommitter(sessionmaker(bind=engine), max_delay=0.05)
+        write = writer._write
+        writer._write = lambda rows: 1 / 0
+        writer.start()
+        failed = await asyncio.gather(writer.submit(post("a")), writer.submit(post("b")),
+                                      return_exceptions=True)
+        writer._write = write
+        row = await writer.submit(post("c"))
+        await writer.stop()
+        return failed, row
+
+    failed, row = asyncio.run(scenario())
+    assert all(isinstance(error, ZeroDivisionError) for error in failed)
+    assert row.id == 1
+
+
+def test_stopped_writer_fails_pending_posts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'posts.db'}")
+    Base.metadata.create_all(engine)
+    writing, release = threading.Event(), threading.Event()
+
+    async def scenario():
+        writer = group_commit.GroupCommitter(sessionmaker(bind=engine), max_batch=1)
+        write = writer._write
+        writer._write = lambda rows: writing.set() or release.wait(5) and write(rows)
+        writer.start()
+        in_flight = asyncio.create_task(writer.submit(post("in flight")))
+        queued = asyncio.create_task(writer.submit(post("queued")))
+        await asyncio.get_running_loop().run_in_executor(None, writing.wait, 5)
+        writer._writer.cancel()  # the writer dies with one batch written and one queued
+        results = await asyncio.wait_for(asyncio.gather(in_flight, queued, return_exceptions=True), 5)
+        release.set()
+        with pytest.raises(HTTPException) as late:
+            await writer.submit(post("late"))
+        await asyncio.wait_for(writer._queue.join(), 5)
+        return results, late.value
+
+    results, late = asyncio.run(scenario())
+    assert [error.status_code for error in results] == [503, 503]
+    assert late.status_code == 503
@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from loader import PostLoader
+from models import Post
+
+
+@pytest.fixture
+def loader_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'loader.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Post), [{"title": f"post {n}", "content": "x"} for n in range(1, 11)])
+    session_factory = sessionmaker(bind=engine)
+    batches = []
+
+    # Records the ids of every batch query the loader sends
+    def make(**kwargs):
+        loader = PostLoader(session_factory, **kwargs)
+        query = loader._query
+        loader._query = lambda post_ids: batches.append(sorted(post_ids)) or query(post_ids)
+        return loader
+
+    yield make, batches
+    engine.dispose()
+
+
+def test_concurrent_loads_share_one_query(loader_factory):
+    make, batches = loader_factory
+
+    async def main():
+        loader = make(window=0.01)
+        return await asyncio.gather(*(loader.load(post_id) for post_id in (3, 1, 2)))
+
+    rows = asyncio.run(main())
+    assert [row.title for row in rows] == ["post 3", "post 1", "post 2"]
+    assert batches == [[1, 2, 3]]
+
+
+def test_same_id_is_fetched_once(loader_factory):
+    make, batches = loader_factory
+
+    async def main():
+        loader = make(window=0.01)
+        futures = [loader._future(4) for _ in range(5)]
+        assert all(future is futures[0] for future in futures)
+        return await asyncio.gather(*(loader.load(4) for _ in range(5)))
+
+    rows = asyncio.run(main())
+    assert {row.id for row in rows} == {4}
+    assert batches == [[4]]
+
+
+def test_full_batch_is_sent_early(loader_factory):
+    make, batches = loader_factory
+
+    async def main():
+        # The window is long enough that only max_batch can send the batches
+        loader = make(window=60, max_batch=4)
+        return await asyncio.wait_for(loader.load_many(list(range(1, 9))), timeout=5)
+
+    rows = asyncio.run(main())
+    assert [row.id for row in rows] == list(range(1, 9))
+    assert batches == [[1, 2, 3, 4], [5, 6, 7, 8]]
+
+
+def test_load_many_keeps_order_and_missing_ids(loader_factory):
+    make, batches = loader_factory
+
+    async def main():
+        return await make().load_many([7, 404, 2])
+
+    rows = asyncio.run(main())
+    assert [row.id if row else None for row in rows] == [7, None, 2]
+    assert batches == [[2, 7, 404]]
+
+
+def test_query_error_reaches_every_caller(loader_factory):
+    make, _ = loader_factory
+
+    async def main():
+        loader = make(window=0.01)
+        loader._query = lambda post_ids: 1 / 0
+        return await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+    assert all(isinstance(result, ZeroDivisionError) for result in asyncio.run(main()))
+
+
+def test_get_posts_by_ids(client):
+    for title in ("one", "two", "three"):
+        client.post("/posts", json={"title": title, "content": "x"})
+
+    response = client.get("/posts", params={"ids": "3,1,404,2,3"})
+    assert response.status_code == 200
+    assert [post["title"] for post in response.json()["items"]] == ["three", "one", "two"]
+    assert response.json()["next_cursor"] is None
+
+    etag = response.headers["ETag"]
+    assert client.get("/posts", params={"ids": "3,1,404,2,3"},
+                      headers={"If-None-Match": etag}).status_code == 304
+    client.put("/posts/1", json={"title": "uno", "content": "x"})
+    response = client.get("/posts", params={"ids": "3,1,404,2,3"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["items"][1]["title"] == "uno"
+
+    response = client.get("/posts", params={"ids": "3,1", "fields": "id"})
+    assert response.json()["items"] == [{"id": 3}, {"id": 1}]
+    assert client.get("/posts", params={"ids": "1,x"}).status_code == 400
+
+
+def test_get_post_by_id_through_the_loader(settings):
+    import main
+    from fastapi.testclient import TestClient
+
+    settings["coalescing"] = {"enabled": True}
+    with TestClient(main.create_app(settings)) as client:
+        Base.metadata.create_all(client.app.state.engine)
+        post_id = client.post("/posts", json={"title": "first", "content": "x"}).json()["id"]
+        response = client.get(f"/posts/{post_id}")
+        assert response.json()["title"] == "first"
+        assert client.get(f"/posts/{post_id}",
+                          headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+        assert client.get("/posts/404").status_code == 404
@@ -0,0 +1,39 @@
+import pytest
+from fastapi.testclient import TestClient
+from shared.profiling import PROFILER
+
+
+@pytest.fixture
+def profiled_client(settings):
+    import main
+
+    settings["profiling"] = {"enabled": True}
+    try:
+        with TestClient(main.create_app(settings)) as client:
+            yield client
+    finally:
+        PROFILER.configure({})
+        PROFILER.reset()
+
+
+def test_top_statements_is_not_mounted_by_default(client):
+    assert client.get("/admin/sql/top").status_code == 404
+
+
+def test_top_statements(profiled_client):
+    from database import Base
+
+    Base.metadata.create_all(profiled_client.app.state.engine)
+    for n in range(3):
+        profiled_client.post("/posts", json={"title": f"post {n}", "content": "x"})
+    response = profiled_client.get("/admin/sql/top", params={"n": 1})
+    assert response.status_code == 200
+    assert response.json()["enabled"] is True
+    assert len(response.json()["statements"]) == 1
+
+
+@pytest.mark.parametrize("n", ["0", "101", "-1", "ten"])
+def test_top_statements_bounds_n(profiled_client, n):
+    response = profiled_client.get("/admin/sql/top", params={"n": n})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "n must be an integer from 1 to 100"
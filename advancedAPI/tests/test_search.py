@@ -0,0 +1,69 @@
+from sqlalchemy import inspect, create_mock_engine
+from database import Base
+
+
+def create_post(client, title, content="x"):
+    response = client.post("/posts", json={"title": title, "content": content})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def search(client, q, **params):
+    response = client.get("/posts/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_title_matches_rank_above_content(client):
+    in_content = create_post(client, "first", "about python")
+    in_title = create_post(client, "python tips", "short")
+    create_post(client, "unrelated", "nothing here")
+    assert [post["id"] for post in search(client, "python")["items"]] == [in_title, in_content]
+
+
+def test_every_term_must_match(client):
+    both = create_post(client, "python asyncio", "x")
+    create_post(client, "python only", "x")
+    assert [post["id"] for post in search(client, "asyncio python")["items"]] == [both]
+    assert search(client, "missing")["items"] == []
+
+
+def test_index_follows_writes(client):
+    post_id = create_post(client, "python", "x")
+    assert [post["id"] for post in search(client, "python")["items"]] == [post_id]
+    client.put(f"/posts/{post_id}", json={"title": "rust", "content": "x"})
+    assert search(client, "python")["items"] == []
+    assert [post["id"] for post in search(client, "rust")["items"]] == [post_id]
+    client.delete(f"/posts/{post_id}")
+    assert search(client, "rust")["items"] == []
+
+
+def test_cursor_pages_by_rank(client):
+    # Two ranks; ties within a rank come back by id descending
+    strong = [create_post(client, f"python {n}", "python") for n in range(3)]
+    weak = [create_post(client, f"post {n}", "python") for n in range(4)]
+    expected = strong[::-1] + weak[::-1]
+
+    seen, cursor = [], None
+    while True:
+        page = search(client, "python", limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += [post["id"] for post in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+    assert client.get("/posts/search", params={"q": "python", "cursor": "bogus"}).status_code == 400
+
+
+def test_search_vector_is_postgres_only(client, app):
+    # SQLite gets no generated column
+    assert "search_vector" not in {column["name"] for column in inspect(app.state.engine).get_columns("posts")}
+
+    # Postgres gets the column and its GIN index with the table
+    statements = []
+    engine = create_mock_engine("postgresql://", lambda sql, *args, **kwargs: statements.append(
+        str(sql.compile(dialect=engine.dialect))))
+    Base.metadata.create_all(engine, checkfirst=False)
+    ddl = "\n".join(statements)
+    assert "search_vector tsvector" in ddl
+    assert "USING GIN (search_vector)" in ddl
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def statements(client, app):
+    # Every statement sent to the primary, plus "COMMIT" for each commit
+    log = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.append(statement.split(None, 1)[0].upper())
+    def commit(conn):
+        log.append("COMMIT")
+    event.listen(app.state.engine, "before_cursor_execute", record)
+    event.listen(app.state.engine, "commit", commit)
+    yield log
+    event.remove(app.state.engine, "before_cursor_execute", record)
+    event.remove(app.state.engine, "commit", commit)
+
+
+def test_each_write_is_one_statement_and_a_commit(client, statements):
+    response = client.post("/posts", json={"title": "first", "content": "x"})
+    assert response.status_code == 201
+    post_id = response.json()["id"]
+    assert statements == ["INSERT", "COMMIT"]
+
+    for method, body in [("PUT", {"title": "second", "content": "x"}), ("PATCH", {"title": "third"})]:
+        statements.clear()
+        response = client.request(method, f"/posts/{post_id}", json=body)
+        assert response.status_code in (200, 201)
+        assert statements == ["UPDATE", "COMMIT"]
+
+    statements.clear()
+    assert client.delete(f"/posts/{post_id}").status_code == 204
+    assert statements == ["DELETE", "COMMIT"]
+
+
+def test_failed_precondition_costs_one_select(client, statements):
+    response = client.post("/posts", json={"title": "first", "content": "x"})
+    post_id = response.json()["id"]
+    stale = f'"{post_id}-1"'
+    client.patch(f"/posts/{post_id}", json={"title": "second"})
+
+    for method, body, dml in [("PUT", {"title": "third", "content": "x"}, "UPDATE"),
+                              ("PATCH", {"title": "third"}, "UPDATE"), ("DELETE", None, "DELETE")]:
+        statements.clear()
+        response = client.request(method, f"/posts/{post_id}", json=body, headers={"If-Match": stale})
+        assert response.status_code == 412
+        # The conditional write matches nothing; one SELECT tells 412 from 404
+        assert statements == [dml, "SELECT"]
+
+    statements.clear()
+    response = client.delete(f"/posts/{post_id + 1}", headers={"If-Match": stale})
+    assert response.status_code == 404
+    assert statements == ["DELETE", "SELECT"]
@@ -0,0 +1,155 @@
+import threading
+import time
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.util import queue as sqla_queue
+
+# Upper bounds, in seconds, of the pool wait-time histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+class _TimedQueueMixin:
+    """Times the pool queue's get(): the only place a checkout waits for
+    another request to return a connection. Opening a new one is not counted."""
+
+    on_wait = None
+
+    def get(self, block: bool = True, timeout: float = None):
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            self.on_wait(time.perf_counter() - start)
+
+
+class _TimedQueue(_TimedQueueMixin, sqla_queue.Queue):
+    pass
+
+
+class _TimedAsyncQueue(_TimedQueueMixin, sqla_queue.AsyncAdaptedQueue):
+    pass
+
+
+class _WaitTimingMixin:
+    """Records how long each checkout waited for a pooled connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self._pool.on_wait = self._record_wait
+
+    def _record_wait(self, waited: float):
+        with self._stats_lock:
+            self.wait_count += 1
+            self.wait_seconds += waited
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+
+    def _do_get(self):
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+
+
+class TimedQueuePool(_WaitTimingMixin, QueuePool):
+    _queue_class = _TimedQueue
+
+
+class TimedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    _queue_class = _TimedAsyncQueue
+
+
+# `url` overrides the connection fields but not the driver: the async engine
+# still needs postgresql+asyncpg when config.yaml says postgresql://. A url for
+# another database, or a plain "postgresql" driver, leaves it as written.
+def database_url(db_config: dict, driver: str = "postgresql") -> str:
+    if "url" in db_config:
+        url = make_url(db_config["url"])
+        backend, _, dbapi = driver.partition("+")
+        if dbapi and url.get_backend_name() == backend:
+            url = url.set(drivername=driver)
+        return url.render_as_string(hide_password=False)
+    return f"{driver}://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['name']}"
+
+
+def _pool_options(db_config: dict) -> dict:
+    pool = db_config.get("pool", {})
+    return {
+        "pool_size": pool.get("size", 5),
+        "max_overflow": pool.get("max_overflow", 10),
+        "pool_timeout": pool.get("timeout", 30),
+        # Test connections on checkout so a failover surfaces as a reconnect, not a 500
+        "pool_pre_ping": pool.get("pre_ping", True),
+        # Recycle before server/proxy idle timeouts silently drop connections
+        "pool_recycle": pool.get("recycle", 1800),
+    }
+
+
+def _is_postgres(url) -> bool:
+    return make_url(url).get_backend_name() == "postgresql"
+
+
+def create_engine_from_config(db_config: dict, url: str = None):
+    """Sync engine for the `database` section of config.yaml.
+
+    Besides the connection details, the section may set:
+      pool: {size, max_overflow, timeout, pre_ping, recycle}
+      statement_timeout: milliseconds before the server cancels a statement
+      application_name: shown in pg_stat_activity
+    The last two are Postgres settings; other databases ignore them.
+    """
+    url = url or database_url(db_config)
+    connect_args = {}
+    if _is_postgres(url) and "statement_timeout" in db_config:
+        connect_args["options"] = f"-c statement_timeout={int(db_config['statement_timeout'])}"
+    if _is_postgres(url) and "application_name" in db_config:
+        connect_args["application_name"] = db_config["application_name"]
+    return create_engine(url, poolclass=TimedQueuePool,
+                         connect_args=connect_args, **_pool_options(db_config))
+
+
+def create_async_engine_from_config(db_config: dict, url: str = None):
+    """asyncpg counterpart of create_engine_from_config, reading the same keys."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = url or database_url(db_config, "postgresql+asyncpg")
+    server_settings = {}
+    if _is_postgres(url) and "statement_timeout" in db_config:
+        server_settings["statement_timeout"] = str(int(db_config["statement_timeout"]))
+    if _is_postgres(url) and "application_name" in db_config:
+        server_settings["application_name"] = db_config["application_name"]
+    return create_async_engine(url,
+                               poolclass=TimedAsyncQueuePool,
+                               connect_args={"server_settings": server_settings} if server_settings else {},
+                               **_pool_options(db_config))
+
+
+def pool_metrics(engine) -> dict:
+    pool = getattr(engine, "sync_engine", engine).pool
+    metrics = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, _WaitTimingMixin):
+        with pool._stats_lock:
+            metrics.update({
+                "wait_count": pool.wait_count,
+                "wait_seconds_total": pool.wait_seconds,
+                "timeouts": pool.timeouts,
+                # Cumulative, Prometheus-style: count of waits <= each bound
+                "wait_histogram": {("+Inf" if bound == float("inf") else str(bound)): sum(pool.wait_buckets[:i + 1])
+                                   for i, bound in enumerate(WAIT_BUCKETS)},
+            })
+    return metrics
@@ -0,0 +1,31 @@
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+from typing_extensions import TypedDict
+from fastapi import HTTPException, status
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a `?fields=id,title` sparse fieldset.
+
+    Returns the requested names in the order of `allowed` (so responses keep
+    their usual key order), or None when the parameter is absent. Unknown
+    names are a 400 rather than being silently dropped.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    allowed = tuple(allowed)
+    unknown = requested.difference(allowed)
+    if not requested or unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"fields must be a comma-separated subset of: {', '.join(allowed)}")
+    return tuple(name for name in allowed if name in requested)
+
+
+@lru_cache(maxsize=256)
+def sparse_model(model, names: Tuple[str, ...]):
+    """A TypedDict with only `names` of a pydantic model's fields, built once
+    per combination. Serializing through it (TypeAdapter.dump_json) leaves out
+    any other keys, so rows may carry extra columns the query needed."""
+    return TypedDict(f"{model.__name__}Fields",
+                     {name: model.model_fields[name].annotation for name in names})
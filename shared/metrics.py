@@ -0,0 +1,161 @@
+import bisect
+import contextvars
+import time
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+# Upper bounds of the histogram buckets (the +Inf bucket is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# [query count, seconds in the database] for the request being handled. The
+# middleware sets a fresh list per request; threadpool workers inherit the
+# context, so they add to the same list.
+_request_db = contextvars.ContextVar("request_db", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, name, label_names):
+        lines = [f"# TYPE {name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{base}}} {series[-1]}")
+            lines.append(f"{name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+# Only the middleware and the async /metrics endpoint touch the registry, and
+# both run on the event loop thread, so it needs no locking.
+class MetricsRegistry:
+    def __init__(self):
+        self.requests = {}  # (method, route, status) -> count
+        self.in_flight = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+
+    def observe_request(self, method, route, status, seconds, size, db_queries, db_seconds):
+        key = (method, route)
+        status_key = (method, route, status)
+        self.requests[status_key] = self.requests.get(status_key, 0) + 1
+        self.latency.observe(key, seconds)
+        self.response_size.observe(key, size)
+        self.db_queries.observe(key, db_queries)
+        self.db_time.observe(key, db_seconds)
+
+    def render(self) -> str:
+        lines = ["# TYPE http_requests_total counter"]
+        for labels, count in sorted(self.requests.items()):
+            lines.append(f"http_requests_total{{{_labels(('method', 'route', 'status'), labels)}}} {count}")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+        names = ("method", "route")
+        lines += self.latency.render("http_request_duration_seconds", names)
+        lines += self.response_size.render("http_response_size_bytes", names)
+        lines += self.db_queries.render("db_queries_per_request", names)
+        lines += self.db_time.render("db_time_seconds_per_request", names)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def record_db_query(seconds: float):
+    """Count one statement against the current request, if there is one."""
+    stats = _request_db.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += seconds
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead) that
+    records count, latency, response size and DB usage per route template."""
+
+    def __init__(self, app, registry: MetricsRegistry = REGISTRY):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500  # if the app raises before starting a response
+        size = 0
+        db_stats = [0, 0.0]
+        token = _request_db.set(db_stats)
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        registry = self.registry
+        registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            registry.in_flight -= 1
+            _request_db.reset(token)
+            # The router stores the matched route in the scope; label by its
+            # template so /posts/1 and /posts/2 share a series
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            registry.observe_request(scope["method"], route, status,
+                                     time.perf_counter() - start, size, db_stats[0], db_stats[1])
+
+
+def instrument_engine(engine):
+    """Time every statement run through a SQLAlchemy engine."""
+    engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        record_db_query(time.perf_counter() - conn.info["metrics_query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        # after_cursor_execute doesn't fire for failed statements
+        if context.connection is not None and context.connection.info.get("metrics_query_start"):
+            context.connection.info["metrics_query_start"].pop()
+
+
+async def metrics_endpoint(request: Request):
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def install_metrics(app, engines=()):
+    """Add the middleware and a GET /metrics route to a FastAPI app."""
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+    for engine in engines:
+        instrument_engine(engine)
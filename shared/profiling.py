@@ -0,0 +1,230 @@
+import contextvars
+import logging
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger("sql.profile")
+
+# Scope of the request being handled, and whether it was picked for EXPLAIN
+_request_scope = contextvars.ContextVar("profile_scope", default=None)
+_explain_request = contextvars.ContextVar("profile_explain", default=False)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(statement: str) -> str:
+    """Collapse literals, placeholders and IN lists so that statements that
+    differ only in their values aggregate together."""
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class StatementStats:
+    __slots__ = ("calls", "total_seconds", "max_seconds", "rows", "params", "last_plan")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.params = 0
+        self.last_plan = None
+
+    def as_dict(self, statement):
+        return {
+            "statement": statement,
+            "calls": self.calls,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(self.total_seconds * 1000 / self.calls, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "rows": self.rows,
+            "mean_params": round(self.params / self.calls, 1),
+            "last_plan": self.last_plan,
+        }
+
+
+class SQLProfiler:
+    """Aggregates per-statement timings and logs slow statements.
+
+    Off by default; turned on by the `profiling` section of config.yaml:
+      enabled: true
+      slow_query_ms: 200         # log statements slower than this
+      explain_sample_rate: 0.01  # fraction of requests whose SELECTs are EXPLAIN ANALYZEd
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_ms = 200.0
+        self.explain_sample_rate = 0.0
+        self.max_statements = 1000  # distinct normalized statements kept
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def configure(self, profiling_config: dict):
+        self.enabled = profiling_config.get("enabled", False)
+        self.slow_query_ms = profiling_config.get("slow_query_ms", self.slow_query_ms)
+        self.explain_sample_rate = profiling_config.get("explain_sample_rate", self.explain_sample_rate)
+
+    def observe(self, statement: str, param_count: int, seconds: float, rowcount: int, explain=None):
+        """Record one executed statement. `explain`, if given, is a callable
+        returning EXPLAIN ANALYZE output lines; it only runs for SELECTs in
+        requests picked for sampling, since it executes the statement again."""
+        if not self.enabled:
+            return
+        normalized = normalize_sql(statement)
+        with self._lock:
+            stats = self._stats.get(normalized)
+            if stats is None:
+                if len(self._stats) >= self.max_statements:
+                    return
+                stats = self._stats[normalized] = StatementStats()
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += max(rowcount, 0)
+            stats.params += param_count
+
+        if seconds * 1000 >= self.slow_query_ms:
+            logger.warning("slow query %.1f ms (%s rows) in %s: %s",
+                           seconds * 1000, rowcount, current_route(), normalized)
+
+        if explain is not None and _explain_request.get() and normalized[:6].upper() == "SELECT":
+            try:
+                plan = explain()
+            except Exception:
+                logger.exception("EXPLAIN ANALYZE failed for: %s", normalized)
+                return
+            stats.last_plan = summarize_plan(plan)
+
+    def top(self, n: int = 10):
+        with self._lock:
+            ranked = sorted(self._stats.items(), key=lambda item: item[1].total_seconds, reverse=True)
+            return [stats.as_dict(statement) for statement, stats in ranked[:n]]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+PROFILER = SQLProfiler()
+
+
+def current_route() -> str:
+    scope = _request_scope.get()
+    if scope is None:
+        return "<no request>"
+    route = getattr(scope.get("route"), "path", scope.get("path"))
+    return f"{scope['method']} {route}"
+
+
+def summarize_plan(lines) -> dict:
+    # The top plan node plus the planning/execution time footer
+    return {
+        "plan": lines[0].strip() if lines else None,
+        "timing": [line.strip() for line in lines if line.strip().startswith(("Planning Time", "Execution Time"))],
+    }
+
+
+class ProfilingMiddleware:
+    """Makes the current route available to the profiler and picks which
+    requests get their SELECTs EXPLAIN ANALYZEd."""
+
+    def __init__(self, app, profiler: SQLProfiler = PROFILER):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.enabled:
+            return await self.app(scope, receive, send)
+        scope_token = _request_scope.set(scope)
+        explain_token = _explain_request.set(random.random() < self.profiler.explain_sample_rate)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _explain_request.reset(explain_token)
+            _request_scope.reset(scope_token)
+
+
+def _param_count(parameters, executemany):
+    if executemany:
+        return sum(len(params) for params in parameters)
+    return len(parameters) if parameters else 0
+
+
+def attach_profiler(engine, profiler: SQLProfiler = PROFILER):
+    """Feed every statement run through a SQLAlchemy engine to the profiler."""
+    engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if profiler.enabled:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("profile_query_start")
+        if not starts:
+            return
+        seconds = time.perf_counter() - starts.pop()
+
+        def explain():
+            # Separate DBAPI cursor on the same connection/transaction, so the
+            # original cursor's results are left alone
+            plan_cursor = cursor.connection.cursor()
+            try:
+                plan_cursor.execute("EXPLAIN ANALYZE " + statement, parameters)
+                return [row[0] for row in plan_cursor.fetchall()]
+            finally:
+                plan_cursor.close()
+
+        # A stream_results SELECT (e.g. the exports) is still being read through
+        # a server-side cursor here; EXPLAIN ANALYZE would run the whole query again
+        streaming = context is not None and context.execution_options.get("stream_results", False)
+        can_explain = conn.dialect.name == "postgresql" and not executemany and not streaming
+        profiler.observe(statement, _param_count(parameters, executemany), seconds, cursor.rowcount,
+                         explain=explain if can_explain else None)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        if context.connection is not None and context.connection.info.get("profile_query_start"):
+            context.connection.info["profile_query_start"].pop()
+
+
+# Upper bound for ?n= on GET /admin/sql/top
+MAX_TOP_STATEMENTS = 100
+
+
+async def top_statements_endpoint(request: Request):
+    try:
+        n = int(request.query_params.get("n", 10))
+    except ValueError:
+        n = 0
+    if not 1 <= n <= MAX_TOP_STATEMENTS:
+        return JSONResponse({"detail": f"n must be an integer from 1 to {MAX_TOP_STATEMENTS}"},
+                            status_code=400)
+    return JSONResponse({"enabled": PROFILER.enabled, "statements": PROFILER.top(n)})
+
+
+def install_profiling(app, profiling_config: dict, engines=()):
+    """Configure the profiler and add its middleware. GET /admin/sql/top is
+    only mounted when profiling is enabled; it exposes SQL text and plans."""
+    PROFILER.configure(profiling_config)
+    app.add_middleware(ProfilingMiddleware)
+    if PROFILER.enabled:
+        app.add_route("/admin/sql/top", top_statements_endpoint, methods=["GET"], include_in_schema=False)
+    for engine in engines:
+        attach_profiler(engine)
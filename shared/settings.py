@@ -0,0 +1,29 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+
+# Where config.yaml is read from: $API_CONFIG if set, otherwise next to
+# config.example.yaml in ApiForBeginners/ORM
+CONFIG_ENV_VAR = "API_CONFIG"
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent.parent / "ApiForBeginners" / "ORM" / "config.yaml"
+
+
+def config_path() -> Path:
+    return Path(os.environ.get(CONFIG_ENV_VAR, DEFAULT_CONFIG_PATH))
+
+
+@lru_cache(maxsize=None)
+def load_settings(path: Path) -> dict:
+    import yaml  # only paid for by processes that actually load settings
+
+    with open(path, "r") as file:
+        return yaml.safe_load(file)
+
+
+def get_settings() -> dict:
+    """The parsed config.yaml, read on first use and cached for the process.
+
+    Nothing reads it at import time: app factories call this (or take a
+    settings dict directly), so importing a module never touches the disk.
+    """
+    return load_settings(config_path())